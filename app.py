@@ -1,16 +1,31 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import json
 import os
 from datetime import date
-from scripts.data_analysis import analyze_mistakes, plot_mistakes_by_type
-from scripts.study_plan import generate_study_plan
-from scripts.export_report import export_pdf
+from scripts.charts import (
+    top_mistakes_chart, domain_chart, score_trends_chart, percentile_chart, total_mistakes_chart, domain_trends_chart,
+    cohort_topics_chart, cohort_heatmap_chart, score_distribution_chart
+)
+from scripts.analysis_cache import incremental_analysis, file_digest, save_once
+from scripts.jobs import FAILED, PENDING, get_job_queue, submit_history_export, submit_history_import, submit_report, submit_rollup_rebuild
+from scripts.history_store import ensure_history_store, save_session, session_results, load_trends, set_student_cohort
+from scripts.cohort import list_cohorts, list_buckets, top_weak_topics, domain_heatmap, score_distribution
+from scripts.study_plan import format_study_plan, history_study_plan
+from scripts.columnar import save_analysis_parquet
+from scripts.profiling import stage, start_collection, finish_collection
+from scripts.validation import AnswerDataError, report_frame
 
 # Set page config for a wider layout and custom theme
 st.set_page_config(page_title="SAT Mistake Analyzer", layout="wide", initial_sidebar_state="expanded")
 
+# Background jobs (PDF reports, rollup rebuilds, history migrations) run on the server's job queue;
+# each session only keeps the ids of the jobs it started and polls their status
+if 'job_ids' not in st.session_state:
+    st.session_state['job_ids'] = []
+
+def track_job(job_id):
+    if job_id not in st.session_state['job_ids']:
+        st.session_state['job_ids'].append(job_id)
+
 # Custom CSS for a cleaner UI
 st.markdown("""
     <style>
@@ -30,55 +45,90 @@ with st.sidebar:
     st.markdown("""
     **Instructions:**
     1. Enter your Student ID or Name.
-    2. Upload a CSV file with your SAT practice test data.
-    3. The CSV should include the following columns:
+    2. Upload a CSV (or Parquet) file with your SAT practice test data.
+    3. The file should include the following columns:
        - Question_ID, Section, Module, Topic, Student_Answer, Correct_Answer, Difficulty
     4. The tool will analyze your mistakes and show your progress over time.
     """)
     student_name = st.text_input("Enter Student ID or Name", placeholder="e.g., JohnDoe123").strip()
-    file = st.file_uploader("Upload Your SAT Score Report (CSV)", type=["csv"], help="Upload a CSV with your SAT practice data.")
+    student_cohort = st.text_input("Class / Cohort (optional)", placeholder="e.g., Period3-2025").strip()
+    file = st.file_uploader("Upload Your SAT Score Report (CSV or Parquet)", type=["csv", "parquet"], help="Upload a CSV or Parquet file with your SAT practice data.")
     st.markdown("---")
     st.markdown("**Navigation**")
-    tab_selection = st.radio("Go to:", ["Analysis", "Progress"])
+    tab_selection = st.radio("Go to:", ["Analysis", "Progress", "Cohort"])
+    show_metrics = st.checkbox("Show performance metrics", help="Time each processing stage of this run (debug)")
     st.markdown("---")
     st.markdown("**About**")
     st.info("This tool analyzes your SAT practice data, tracks progress, and provides insights to improve your score.")
 
 # Main content
-if file and student_name:
-    try:
-        df = pd.read_csv(file)
-        analysis = analyze_mistakes(df)
+if tab_selection == "Cohort":
+    # Class/district views come straight from the rollup tables, no per-student history is read
+    st.header("Cohort Analytics")
+    ensure_history_store()
+    cohorts = list_cohorts()
+    labels = {"All students": None, **{(cohort or "Unassigned"): cohort for cohort in cohorts}}
+    col1, col2, col3 = st.columns([2, 2, 1])
+    cohort = labels[col1.selectbox("Cohort", list(labels))]
+    buckets = list_buckets(cohort)
+    if not buckets:
+        st.info("No saved sessions yet. Cohort views fill in as students upload their practice tests.")
+    else:
+        start_bucket, end_bucket = col2.select_slider("Months", options=buckets, value=(buckets[0], buckets[-1]))
+        k = col3.number_input("Top topics", min_value=1, max_value=50, value=10)
 
-        # Save history for trend analysis
+        st.subheader(f"Top {k} Weakest Topics (Weighted by Difficulty)")
+        st.plotly_chart(cohort_topics_chart(top_weak_topics(k, cohort, start_bucket, end_bucket)), use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("**Mistakes by Content Domain per Month**")
+            st.plotly_chart(cohort_heatmap_chart(domain_heatmap(cohort, start_bucket, end_bucket)), use_container_width=True)
+        with col2:
+            st.write("**Total Score Distribution**")
+            st.plotly_chart(score_distribution_chart(score_distribution(cohort, start_bucket, end_bucket)), use_container_width=True)
+
+    # Maintenance runs in the background; progress shows under Background Jobs in the sidebar
+    with st.expander("Maintenance"):
+        col1, col2, col3 = st.columns(3)
+        if col1.button("Rebuild cohort rollups", help="Recompute the cohort tables from every saved session"):
+            track_job(submit_rollup_rebuild())
+        if col2.button("Import history.json", help="Add sessions from the legacy history.json file (existing sessions are kept)"):
+            track_job(submit_history_import())
+        if col3.button("Export history.json", help="Write all saved sessions to history.json"):
+            track_job(submit_history_export())
+
+elif file and student_name:
+    # Opt-in stage timings; also appended as JSON lines to $SAT_METRICS_LOG when that is set
+    metrics_log = os.environ.get("SAT_METRICS_LOG")
+    metrics = start_collection(student=student_name) if show_metrics or metrics_log else None
+    try:
+        data = file.getvalue()
+        digest = file_digest(data)
         today = str(date.today())
-        history_file = "history.json"
-
-        # Prepare data to save
-        today_results = {
-            'mistakes': dict(zip(analysis['mistakes_by_topic']["Topic"], analysis['mistakes_by_topic']["Mistakes"])),
-            'scores': analysis['scores'],
-            'mistakes_by_domain': analysis['mistakes_by_domain'].groupby('Content_Domain')['Mistakes'].sum().to_dict()
-        }
-
-        if os.path.exists(history_file):
-            with open(history_file, "r") as f:
-                full_history = json.load(f)
-        else:
-            full_history = {}
+        ensure_history_store()
+        # A corrected re-upload of today's sheet only re-aggregates the questions that changed
+        with stage('analysis'):
+            analysis, plan_dict = incremental_analysis(data, student_name, today, digest)
 
-        if student_name not in full_history:
-            full_history[student_name] = {}
+        # Save history for trend analysis
+        @stage('history_write')
+        def save_today():
+            if student_cohort:
+                set_student_cohort(student_name, student_cohort)
+            save_session(student_name, today, session_results(analysis))
+            # Optional columnar copy of the analysis tables for cohort queries
+            if os.environ.get("SAT_PARQUET_DIR"):
+                save_analysis_parquet(analysis, os.environ["SAT_PARQUET_DIR"], student_name, today)
 
-        full_history[student_name][today] = today_results
-        with open(history_file, "w") as f:
-            json.dump(full_history, f, indent=4)
+        # Only the first run for this upload writes history; widget reruns reuse the cached analysis
+        save_once(student_name, digest, today, save_today)
 
-        # Generate study plan
-        plan_dict = generate_study_plan(analysis['top_mistakes'])
-        plan_str = "Study Plan:\n\n" + "\n".join([f"{topic}: {time}" for topic, time in plan_dict.items()])
+        # Study plan text for the report
+        plan_str = format_study_plan(plan_dict)
 
         # Tab content
+        # Figures come from the chart cache (keyed on their input tables), so reruns don't rebuild them
         if tab_selection == "Analysis":
             st.header(f"Analysis Dashboard for {student_name}")
             
@@ -122,21 +172,15 @@ if file and student_name:
             col1, col2 = st.columns([1, 1])
             with col1:
                 st.write("**Top 5 Weaknesses (Weighted by Difficulty)**")
-                fig = px.bar(
-                    analysis['top_mistakes'],
-                    x='Weighted_Mistakes',
-                    y='Topic',
-                    color='Section',
-                    text='Weighted_Mistakes',
-                    title="Top 5 Weaknesses",
-                    height=400
-                )
-                fig.update_traces(textposition='outside')
-                fig.update_layout(showlegend=True, margin=dict(l=0, r=0, t=30, b=0))
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(top_mistakes_chart(analysis['top_mistakes']), use_container_width=True)
             with col2:
                 st.write("**Mistakes by Content Domain**")
-                st.pyplot(plot_mistakes_by_type(analysis['mistakes_by_domain']))
+                # Plotly unless SAT_CHART_BACKEND=matplotlib, which yields a cached PNG of the seaborn chart
+                fig = domain_chart(analysis['mistakes_by_domain'])
+                if isinstance(fig, bytes):
+                    st.image(fig, use_container_width=True)
+                else:
+                    st.plotly_chart(fig, use_container_width=True)
 
             # Study Plan
             st.subheader("Recommended Study Plan")
@@ -145,116 +189,110 @@ if file and student_name:
 
         else:  # Progress Tab
             st.header(f"Progress Tracker for {student_name}")
-            history = full_history[student_name]
-            
-            if len(history) >= 1:
-                dates = []
-                total_scores = []
-                rw_scores = []
-                math_scores = []
-                percentiles = []
-                total_mistakes = []
-                domain_mistakes = {domain: [] for domain in set(sum((list(data['mistakes_by_domain'].keys()) for data in history.values()), []))}
-
-                for date, data in history.items():
-                    dates.append(date)
-                    total_scores.append(data['scores']['total_score'])
-                    rw_scores.append(data['scores']['rw_scaled'])
-                    math_scores.append(data['scores']['math_scaled'])
-                    percentiles.append(data['scores']['percentile'])
-                    total_mistakes.append(sum(data['mistakes'].values()))
-                    for domain in domain_mistakes:
-                        domain_mistakes[domain].append(data['mistakes_by_domain'].get(domain, 0))
-
-                trends_df = pd.DataFrame({
-                    'Date': dates,
-                    'Total Score': total_scores,
-                    'Reading and Writing Score': rw_scores,
-                    'Math Score': math_scores,
-                    'Percentile': percentiles,
-                    'Total Mistakes': total_mistakes
-                })
+            with stage('load_trends') as trends_stage:
+                trends_df, domain_trends_df = load_trends(student_name)
+                trends_stage.rows = len(trends_df)
 
+            if len(trends_df) >= 1:
                 # Score Trends
                 st.subheader("Score Trends Over Time")
-                fig = px.line(
-                    trends_df,
-                    x='Date',
-                    y=['Total Score', 'Reading and Writing Score', 'Math Score'],
-                    title="Score Trends",
-                    markers=True,
-                    height=400
-                )
-                fig.update_layout(showlegend=True, margin=dict(l=0, r=0, t=30, b=0))
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(score_trends_chart(trends_df), use_container_width=True)
 
                 # Percentile and Total Mistakes Trends
                 col1, col2 = st.columns(2)
                 with col1:
                     st.write("**Percentile Trends**")
-                    fig = px.line(
-                        trends_df,
-                        x='Date',
-                        y='Percentile',
-                        title="Percentile Trends",
-                        markers=True,
-                        color_discrete_sequence=['purple'],
-                        height=300
-                    )
-                    fig.update_layout(showlegend=False, margin=dict(l=0, r=0, t=30, b=0))
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(percentile_chart(trends_df), use_container_width=True)
                 with col2:
                     st.write("**Total Mistakes Over Time**")
-                    fig = px.line(
-                        trends_df,
-                        x='Date',
-                        y='Total Mistakes',
-                        title="Total Mistakes",
-                        markers=True,
-                        color_discrete_sequence=['red'],
-                        height=300
-                    )
-                    fig.update_layout(showlegend=False, margin=dict(l=0, r=0, t=30, b=0))
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(total_mistakes_chart(trends_df), use_container_width=True)
 
                 # Mistakes by Content Domain Trends
                 st.subheader("Mistakes by Content Domain Over Time")
-                domain_trends_df = pd.DataFrame(domain_mistakes)
-                domain_trends_df['Date'] = dates
-                fig = px.line(
-                    domain_trends_df.melt(id_vars='Date', var_name='Content Domain', value_name='Mistakes'),
-                    x='Date',
-                    y='Mistakes',
-                    color='Content Domain',
-                    title="Mistakes by Content Domain Trends",
-                    markers=True,
-                    height=400
-                )
-                fig.update_layout(showlegend=True, margin=dict(l=0, r=0, t=30, b=0))
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(domain_trends_chart(domain_trends_df), use_container_width=True)
 
                 # Comparison Table
                 st.subheader("Performance Comparison")
-                trends_df['Score Change'] = trends_df['Total Score'].diff()
-                trends_df['Mistake Change'] = trends_df['Total Mistakes'].diff()
                 trends_df['Score Trend'] = trends_df['Score Change'].apply(lambda x: "↑ Improved" if x > 0 else ("↓ Declined" if x < 0 else "No Change"))
                 trends_df['Mistake Trend'] = trends_df['Mistake Change'].apply(lambda x: "↓ Improved" if x < 0 else ("↑ Increased" if x > 0 else "No Change"))
-                trends_df_styled = trends_df.style.applymap(
+                trends_df_styled = trends_df.style.map(
                     lambda x: 'color: green' if 'Improved' in str(x) else ('color: red' if 'Declined' in str(x) or 'Increased' in str(x) else ''),
                     subset=['Score Trend', 'Mistake Trend']
                 )
                 st.dataframe(trends_df_styled, use_container_width=True)
 
-        # Download Report Button
+                # Weekly plan from the whole history: decayed mistake rate and trend, spaced reviews
+                st.subheader("Weekly Study Plan (From Your History)")
+                weekly_hours = st.slider("Study hours per week", min_value=2, max_value=30, value=10)
+                history_plan = history_study_plan(student_name, weekly_hours=weekly_hours)
+                st.dataframe(
+                    history_plan.drop(columns=['Student']).assign(Review_Dates=history_plan['Review_Dates'].map(lambda days: ", ".join(str(day) for day in days))),
+                    use_container_width=True
+                )
+
+        # Report is rendered in the background; the download appears under Background Jobs in the sidebar
         st.markdown("---")
-        if st.button("Download Report", help="Download a PDF report of your analysis"):
-            pdf_file = export_pdf(student_name, analysis, plan_str)
-            with open(pdf_file, "rb") as f:
-                st.download_button("Download PDF", f, file_name=pdf_file, mime="application/pdf")
+        if st.button("Generate Report", help="Build a PDF report of your analysis"):
+            track_job(submit_report(student_name, analysis, plan_str, digest))
+            st.info("Your report is being generated. Download it from Background Jobs in the sidebar.")
+
+    except AnswerDataError as e:
+        st.error("Your file was rejected before analysis. Fix the rows below and upload it again.")
+        st.dataframe(report_frame(e.report), use_container_width=True)
 
     except Exception as e:
         st.error(f"Error processing your file: {str(e)}")
         st.info("Please ensure your CSV file has the correct columns: Question_ID, Section, Module, Topic, Student_Answer, Correct_Answer, Difficulty.")
 
+    finally:
+        if metrics is not None:
+            finish_collection(metrics, metrics_log)
+            if show_metrics:
+                with st.expander("Performance metrics (debug)"):
+                    st.write(f"Total: {metrics['total_seconds'] * 1000:.1f} ms, peak RSS: {metrics['peak_rss_mb'] or 0:.0f} MB")
+                    st.dataframe(metrics['stages'], use_container_width=True)
+
 else:
-    st.info("Please enter your Student ID or Name and upload a CSV file to start analyzing your SAT performance.")
\ No newline at end of file
+    st.info("Please enter your Student ID or Name and upload a CSV file to start analyzing your SAT performance.")
+
+def show_job(queue, job):
+    if job['status'] in PENDING:
+        st.write(f"⏳ {job['label']} ({job['status']})")
+    elif job['status'] == FAILED:
+        st.write(f"❌ {job['label']} failed: {job['error']}")
+    elif job['file_name'] is not None:
+        data = queue.artifact(job['id'])
+        if data is None:
+            st.write(f"🗑 {job['label']} expired, please generate it again")
+        else:
+            st.download_button(f"Download {job['file_name']}", data, file_name=job['file_name'], mime=job['mime'], key=f"job_{job['id']}")
+    else:
+        st.write(f"✅ {job['result']}")
+
+def session_jobs():
+    # Status of this session's jobs; ids the queue has since forgotten are dropped
+    queue = get_job_queue()
+    jobs = [job for job in (queue.status(job_id) for job_id in st.session_state['job_ids']) if job is not None]
+    st.session_state['job_ids'] = [job['id'] for job in jobs]
+    return jobs
+
+def show_jobs(polling):
+    jobs = session_jobs()
+    if polling and not any(job['status'] in PENDING for job in jobs):
+        st.rerun()  # all done: one full rerun redraws the panel without the poll timer
+    queue = get_job_queue()
+    for job in jobs:
+        show_job(queue, job)
+    if st.button("Clear finished jobs"):
+        st.session_state['job_ids'] = [job['id'] for job in jobs if job['status'] in PENDING]
+        st.rerun()
+
+# Drawn last so jobs submitted during this run are listed. While any is pending the panel reruns
+# on its own every second (as a fragment, without rerunning the page) until they finish.
+jobs = session_jobs()
+if jobs:
+    polling = any(job['status'] in PENDING for job in jobs)
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("**Background Jobs**")
+        st.fragment(run_every=1 if polling else None)(show_jobs)(polling)
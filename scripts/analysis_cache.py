@@ -0,0 +1,94 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from scripts.columnar import is_parquet, read_parquet_answers
+from scripts.data_analysis import analyze_incremental, answer_state_from_dict, answer_state_to_dict
+from scripts.history_store import HISTORY_DB, load_answer_state, save_answer_state
+from scripts.profiling import stage
+from scripts.study_plan import generate_study_plan
+from scripts.validation import check_answers
+
+MAX_ENTRIES = 32
+
+class LRUCache:
+    # Process-wide, so it survives Streamlit reruns and is shared between sessions
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        # Compute outside the lock so one slow file doesn't stall every other session
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_analyses = LRUCache()
+_saved_sessions = LRUCache(max_entries=1024)
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def read_upload(data):
+    # Parsed, validated and normalized; raises validation.AnswerDataError for unusable uploads
+    if is_parquet(data):
+        df = read_parquet_answers(io.BytesIO(data))
+    else:
+        with stage('parse_csv') as parse_stage:
+            df = pd.read_csv(io.BytesIO(data))
+            parse_stage.rows = len(df)
+    return check_answers(df)[0]
+
+def incremental_analysis(data, student, date, digest=None, db_path=HISTORY_DB):
+    # Parse + analyze + plan once per distinct upload (results are shared, so treat them as read-only).
+    # A re-upload by the same student on the same day is diffed against the stored per-question
+    # state of their previous upload and only the changed questions are re-aggregated.
+    def compute():
+        previous = load_answer_state(student, date, db_path)
+        analysis, state = analyze_incremental(read_upload(data), previous and answer_state_from_dict(previous))
+        save_answer_state(student, date, answer_state_to_dict(state), db_path)
+        plan_dict = generate_study_plan(analysis['top_mistakes'])
+        return analysis, plan_dict
+    digest = digest or file_digest(data)
+    return _analyses.get_or_compute((digest, 'incremental', student, str(date)), compute)
+
+def save_once(student, digest, date, save):
+    # Reruns for the same upload on the same day shouldn't write history again. Remember the
+    # last digest saved per (student, date) so switching back to an earlier file still saves it.
+    key = (student, str(date))
+    if _saved_sessions.get(key) != digest:
+        save()
+        _saved_sessions.put(key, digest)
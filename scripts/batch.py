@@ -0,0 +1,139 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from scripts.columnar import read_parquet_answers, save_analysis_parquet
+from scripts.data_analysis import analyze_mistakes, analyze_mistakes_chunked, CHUNK_SIZE
+from scripts.study_plan import generate_study_plan, format_study_plan
+from scripts.export_report import export_pdf
+from scripts.history_store import HISTORY_DB, ensure_history_store, save_sessions, session_date as iso_session_date, session_results
+from scripts.scoring_model import DEFAULT_FORM, list_forms, load_scoring_model
+from scripts.validation import StreamValidator, check_answers
+
+MANIFEST = "batch_manifest.jsonl"
+FLUSH_EVERY = 100
+# A batch task is a whole student file (possibly millions of rows, plus a PDF), so workers are
+# replaced after a few dozen files to return the heap those left behind to the OS
+TASKS_PER_WORKER = 50
+
+def scan_file(path):
+    # Digest for resume checks and a line count for throughput stats (CSV only), in one read of the file
+    digest = hashlib.sha256()
+    lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+            lines += block.count(b"\n")
+    return digest.hexdigest(), max(lines - 1, 0)
+
+def process_file(path, output_dir, chunksize=CHUNK_SIZE, parquet_dir=None, session_date=None, form=None):
+    student_name = os.path.splitext(os.path.basename(path))[0]
+    if path.lower().endswith(".parquet"):
+        digest = scan_file(path)[0]
+        df = check_answers(read_parquet_answers(path))[0]
+        rows = len(df)
+        analysis = analyze_mistakes(df, engine='compact', form=form)
+        del df
+    else:
+        digest, rows = scan_file(path)
+        validator = StreamValidator()
+        analysis = analyze_mistakes_chunked(path, chunksize=chunksize, prepare=validator, form=form)
+        validator.finish()
+    if parquet_dir:
+        save_analysis_parquet(analysis, parquet_dir, student_name, session_date)
+    plan_dict = generate_study_plan(analysis['top_mistakes'])
+    pdf_file = export_pdf(student_name, analysis, format_study_plan(plan_dict), output_dir)
+    return {
+        'file': os.path.basename(path),
+        'student': student_name,
+        'digest': digest,
+        'rows': rows,
+        'pdf': os.path.basename(pdf_file),
+        'results': session_results(analysis)
+    }
+
+def load_manifest(output_dir):
+    # file -> digest of every input already analyzed, reported and saved to history
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    done = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partial last line from a crash
+                done[entry['file']] = entry['digest']
+    return done
+
+def run_batch(input_dir, output_dir, session_date=None, workers=None, db_path=HISTORY_DB, chunksize=CHUNK_SIZE, parquet_dir=None, form=None):
+    session_date = iso_session_date(session_date or date.today())
+    if form is not None:
+        load_scoring_model(form)  # unknown form: fail before any file is processed
+    os.makedirs(output_dir, exist_ok=True)
+    ensure_history_store(db_path)
+
+    done = load_manifest(output_dir)
+    paths = sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir) if name.lower().endswith((".csv", ".parquet")))
+    # Only files seen in an earlier run need hashing; changed ones are redone
+    pending = [path for path in paths if os.path.basename(path) not in done or done[os.path.basename(path)] != scan_file(path)[0]]
+
+    stats = {'files': 0, 'rows': 0, 'skipped': len(paths) - len(pending), 'failed': []}
+    completed = []
+
+    def flush():
+        # History first, then the manifest: a crash in between only repeats idempotent upserts
+        if not completed:
+            return
+        save_sessions([(entry['student'], session_date, entry['results']) for entry in completed], db_path)
+        with open(os.path.join(output_dir, MANIFEST), "a") as f:
+            for entry in completed:
+                f.write(json.dumps({key: entry[key] for key in ('file', 'digest', 'student', 'pdf')}) + "\n")
+        completed.clear()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=TASKS_PER_WORKER) as executor:
+        futures = {executor.submit(process_file, path, output_dir, chunksize, parquet_dir, session_date, form): path for path in pending}
+        for future in as_completed(futures):
+            try:
+                entry = future.result()
+            except Exception as e:
+                stats['failed'].append((os.path.basename(futures[future]), str(e)))
+                continue
+            completed.append(entry)
+            stats['files'] += 1
+            stats['rows'] += entry['rows']
+            if len(completed) >= FLUSH_EVERY:
+                flush()
+    flush()
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a directory of per-student SAT practice CSV/Parquet files and write PDF reports.")
+    parser.add_argument("input_dir", help="Directory of CSV or Parquet files, one per student (file name = student name)")
+    parser.add_argument("-o", "--output-dir", default="reports", help="Where PDF reports and the resume manifest are written")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--date", type=iso_session_date, default=None, help="Session date to record in history, YYYY-MM-DD (default: today)")
+    parser.add_argument("--db", default=HISTORY_DB, help="History store path")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Rows read per chunk in each worker")
+    parser.add_argument("--parquet-dir", default=None, help="Also persist per-test analysis tables as Parquet partitioned by student/date")
+    parser.add_argument("--form", help=f"Test form whose scoring tables are used for every file (default: each sheet's Form column, else '{DEFAULT_FORM}'; available: {', '.join(list_forms())})")
+    args = parser.parse_args(argv)
+
+    stats = run_batch(args.input_dir, args.output_dir, args.date, args.workers, args.db, args.chunksize, args.parquet_dir, args.form)
+
+    seconds = max(stats['seconds'], 1e-9)
+    print(f"Processed {stats['files']} files ({stats['rows']} rows) in {seconds:.2f}s, skipped {stats['skipped']} already done")
+    print(f"Throughput: {stats['files'] / seconds:.1f} files/s, {stats['rows'] / seconds:.0f} rows/s")
+    for name, error in stats['failed']:
+        print(f"Failed: {name}: {error}")
+    return 1 if stats['failed'] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from scripts.data_analysis import (
+    analyze_mistakes, calculate_scores, map_content_domains, map_to_content_domain, score_cohort, summarize_mistakes
+)
+from scripts.export_report import render_pdf
+from scripts.history_store import save_sessions, session_results
+from scripts.study_plan import format_study_plan, generate_study_plan
+from scripts.synthetic_data import generate_answers
+
+BASELINE_FILE = "benchmark_baseline.json"
+# The row-wise apply path is minutes per million rows; past this size it is timed on a sample
+APPLY_SAMPLE_ROWS = 200_000
+DEFAULT_THRESHOLD = 1.25
+# Millisecond-scale stages jitter by more than the threshold; ignore slowdowns smaller than this
+MIN_REGRESSION_SECONDS = 0.01
+
+def measure(results, stage, rows, fn, repeat=3):
+    # Best-of-N wall time with tracing off, then one traced run for peak allocation
+    # (numpy and pandas buffers included); tracemalloc slows Python-heavy stages too much to time them
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        value = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    results[stage] = {'seconds': seconds, 'peak_mb': peak / 2**20, 'rows': rows}
+    return value
+
+def run_benchmarks(n_students=100, n_tests=1, error_rate=0.3, seed=0, repeat=3, workdir=None):
+    results = {}
+
+    def stage(name, rows, fn):
+        return measure(results, name, rows, fn, repeat)
+
+    answers = generate_answers(n_students, n_tests, error_rate=error_rate, seed=seed)
+    rows = len(answers)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        csv_path = os.path.join(tmp, "answers.csv")
+        answers.to_csv(csv_path, index=False)
+        del answers
+
+        df = stage('parse', rows, lambda: pd.read_csv(csv_path))
+        correct = stage('correct_flag', rows, lambda: df['Student_Answer'] == df['Correct_Answer'])
+        df['Correct'] = correct
+
+        sample = df.head(APPLY_SAMPLE_ROWS)
+        stage('domain_mapping_apply', len(sample), lambda: sample.apply(map_to_content_domain, axis=1))
+        df['Content_Domain'] = stage('domain_mapping_vectorized', rows, lambda: map_content_domains(df))
+
+        mistakes_df = df[~correct]
+        first_test = df[(df['Student_ID'] == df['Student_ID'].iloc[0]) & (df['Test_ID'] == df['Test_ID'].iloc[0])].copy()
+        scores = stage('scoring_single_test', len(first_test), lambda: calculate_scores(first_test))
+        stage('groupbys_apply', len(mistakes_df), lambda: summarize_mistakes(mistakes_df, scores, 'apply'))
+        analysis = stage('groupbys_vectorized', len(mistakes_df), lambda: summarize_mistakes(mistakes_df, scores, 'vectorized'))
+        cohort = stage('scoring_cohort', rows, lambda: score_cohort(df))
+        stage('analyze_compact', rows, lambda: analyze_mistakes(df, engine='compact'))
+
+        # One stored session per scored test, written the way the app and batch CLI write them
+        results_row = session_results(analysis)
+        sessions = [(student, f"2025-01-{test % 28 + 1:02d}", dict(results_row, scores=scores))
+                    for student, test in zip(cohort['Student_ID'], cohort['Test_ID'])]
+        db_path = os.path.join(tmp, "history.db")
+        stage('history_write', len(sessions), lambda: save_sessions(sessions, db_path))
+
+        plan = format_study_plan(generate_study_plan(analysis['top_mistakes']))
+        stage('pdf', 1, lambda: render_pdf(str(cohort['Student_ID'].iloc[0]), analysis, plan))
+
+    return {'config': {'students': n_students, 'tests': n_tests, 'rows': rows, 'error_rate': error_rate, 'seed': seed}, 'stages': results}
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    # Stages whose time grew by more than threshold x the baseline (and by a measurable amount)
+    regressions = []
+    for stage, current in report['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous or previous['seconds'] <= 0:
+            continue
+        if current['seconds'] / previous['seconds'] > threshold and current['seconds'] - previous['seconds'] > MIN_REGRESSION_SECONDS:
+            regressions.append(stage)
+    return regressions
+
+def format_report(report, baseline=None):
+    lines = [f"{'stage':<28}{'rows':>12}{'seconds':>12}{'peak MB':>10}{'vs base':>10}"]
+    for stage, current in report['stages'].items():
+        previous = (baseline or {}).get('stages', {}).get(stage)
+        ratio = f"{current['seconds'] / previous['seconds']:.2f}x" if previous and previous['seconds'] > 0 else "-"
+        lines.append(f"{stage:<28}{current['rows']:>12}{current['seconds']:>12.4f}{current['peak_mb']:>10.1f}{ratio:>10}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each analysis stage on synthetic SAT answer data and compare with a stored baseline.")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--tests", type=int, default=1, help="Practice tests per student")
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is kept)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Fail when a stage is this many times slower than baseline")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.students, args.tests, args.error_rate, args.seed, args.repeat)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            print(f"Baseline {args.baseline} was recorded with a different configuration; not comparing")
+            baseline = None
+
+    print(f"{report['config']['rows']} rows ({args.students} students x {args.tests} tests)")
+    print(format_report(report, baseline))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    regressions = compare(report, baseline, args.threshold) if baseline else []
+    for stage in regressions:
+        print(f"REGRESSION: {stage} is more than {args.threshold}x slower than baseline")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+from scripts.analysis_cache import LRUCache
+from scripts.profiling import stage
+
+# Serialized figures (plotly JSON / PNG bytes) keyed on (chart, hash of its input table), so a
+# rerun with unchanged data deserializes instead of rebuilding, and nothing figure-sized is
+# kept alive beyond the cache bound.
+MAX_FIGURES = 128
+_figures = LRUCache(max_entries=MAX_FIGURES)
+
+# 'plotly' (default) never imports matplotlib/seaborn; 'matplotlib' renders the seaborn domain chart as a PNG
+CHART_BACKENDS = ('plotly', 'matplotlib')
+CHART_BACKEND = os.environ.get("SAT_CHART_BACKEND", "plotly")
+
+MARGIN = dict(l=0, r=0, t=30, b=0)
+
+def frame_digest(frame, *params):
+    # Content hash of a table (values, index and column names) plus any chart options
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+    digest.update(repr((list(frame.columns), frame.index.names, params)).encode())
+    return digest.hexdigest()
+
+def cached_plotly(name, frame, build, *params):
+    # build(frame, *params) -> plotly figure; only its JSON is cached
+    import plotly.io as pio
+
+    def compute():
+        with stage(f'chart_{name}', rows=len(frame)):
+            return build(frame, *params).to_json()
+    return pio.from_json(_figures.get_or_compute((name, frame_digest(frame, *params)), compute))
+
+def cached_png(name, frame, build, *params):
+    # build(frame, *params) -> matplotlib figure; rendered to PNG bytes and closed right away
+    def compute():
+        import matplotlib.pyplot as plt
+
+        with stage(f'chart_{name}', rows=len(frame)):
+            fig = build(frame, *params)
+            try:
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format='png', dpi=100)
+                return buffer.getvalue()
+            finally:
+                plt.close(fig)
+    return _figures.get_or_compute((name, frame_digest(frame, *params)), compute)
+
+def clear_chart_cache():
+    _figures.clear()
+
+# Figure builders
+
+def _top_mistakes_bar(top_mistakes):
+    import plotly.express as px
+
+    fig = px.bar(top_mistakes, x='Weighted_Mistakes', y='Topic', color='Section', text='Weighted_Mistakes',
+                 title="Top 5 Weaknesses", height=400)
+    fig.update_traces(textposition='outside')
+    fig.update_layout(showlegend=True, margin=MARGIN)
+    return fig
+
+def _domain_bar(mistakes_by_domain):
+    # Plotly counterpart of data_analysis.plot_mistakes_by_type
+    import plotly.express as px
+
+    fig = px.bar(mistakes_by_domain, x='Content_Domain', y='Mistakes', color='Section', pattern_shape='Module',
+                 barmode='group', title="Mistakes by Content Domain Across Sections and Modules", height=400)
+    fig.update_layout(xaxis_tickangle=-45, margin=MARGIN)
+    return fig
+
+def _trend_line(trends_df, y, title, color, height):
+    import plotly.express as px
+
+    fig = px.line(trends_df, x='Date', y=list(y) if isinstance(y, tuple) else y, title=title, markers=True,
+                  color_discrete_sequence=[color] if color else None, height=height)
+    fig.update_layout(showlegend=isinstance(y, tuple), margin=MARGIN)
+    return fig
+
+def _domain_trend_lines(domain_trends_df):
+    import plotly.express as px
+
+    fig = px.line(domain_trends_df.melt(id_vars='Date', var_name='Content Domain', value_name='Mistakes'),
+                  x='Date', y='Mistakes', color='Content Domain', title="Mistakes by Content Domain Trends",
+                  markers=True, height=400)
+    fig.update_layout(showlegend=True, margin=MARGIN)
+    return fig
+
+def _cohort_topics_bar(top_topics):
+    import plotly.express as px
+
+    fig = px.bar(top_topics, x='Weighted_Mistakes', y='Topic', color='Section', orientation='h', height=400)
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'}, margin=MARGIN)
+    return fig
+
+def _heatmap(heatmap):
+    import plotly.express as px
+
+    fig = px.imshow(heatmap, aspect='auto', color_continuous_scale='Reds', labels=dict(color='Mistakes'))
+    fig.update_layout(margin=MARGIN)
+    return fig
+
+def _score_bands_bar(distribution):
+    import plotly.express as px
+
+    fig = px.bar(distribution, x='Score Band', y='Sessions', height=400)
+    fig.update_layout(margin=MARGIN)
+    return fig
+
+# Cached figures used by the app
+
+def top_mistakes_chart(top_mistakes):
+    return cached_plotly('top_mistakes', top_mistakes, _top_mistakes_bar)
+
+def domain_chart(mistakes_by_domain, backend=None):
+    # Plotly figure, or PNG bytes for the matplotlib backend
+    backend = backend or CHART_BACKEND
+    if backend not in CHART_BACKENDS:
+        raise ValueError(f"Unknown chart backend: {backend} (expected one of {', '.join(CHART_BACKENDS)})")
+    if backend == 'matplotlib':
+        from scripts.data_analysis import plot_mistakes_by_type
+        return cached_png('domain_mpl', mistakes_by_domain, plot_mistakes_by_type)
+    return cached_plotly('domain', mistakes_by_domain, _domain_bar)
+
+def score_trends_chart(trends_df):
+    return cached_plotly('score_trends', trends_df, _trend_line,
+                         ('Total Score', 'Reading and Writing Score', 'Math Score'), "Score Trends", None, 400)
+
+def percentile_chart(trends_df):
+    return cached_plotly('percentile', trends_df, _trend_line, 'Percentile', "Percentile Trends", 'purple', 300)
+
+def total_mistakes_chart(trends_df):
+    return cached_plotly('total_mistakes', trends_df, _trend_line, 'Total Mistakes', "Total Mistakes", 'red', 300)
+
+def domain_trends_chart(domain_trends_df):
+    return cached_plotly('domain_trends', domain_trends_df, _domain_trend_lines)
+
+def cohort_topics_chart(top_topics):
+    return cached_plotly('cohort_topics', top_topics, _cohort_topics_bar)
+
+def cohort_heatmap_chart(heatmap):
+    return cached_plotly('cohort_heatmap', heatmap, _heatmap)
+
+def score_distribution_chart(distribution):
+    return cached_plotly('score_distribution', distribution, _score_bands_bar)
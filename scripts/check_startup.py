@@ -0,0 +1,74 @@
+import argparse
+import subprocess
+import sys
+
+# Modules every entry point imports at startup (app.py's own imports, minus streamlit itself)
+STARTUP_MODULES = [
+    'scripts.analysis_cache',
+    'scripts.batch',
+    'scripts.charts',
+    'scripts.cohort',
+    'scripts.columnar',
+    'scripts.data_analysis',
+    'scripts.explanations',
+    'scripts.export_report',
+    'scripts.history_store',
+    'scripts.jobs',
+    'scripts.profiling',
+    'scripts.scoring_model',
+    'scripts.service',
+    'scripts.study_plan',
+    'scripts.validation',
+]
+
+# Only loaded when their feature is used: charts, matplotlib figures, PDF export
+LAZY_PACKAGES = ['matplotlib', 'seaborn', 'plotly', 'reportlab']
+
+# Cold-start budget for importing all of STARTUP_MODULES, in milliseconds
+DEFAULT_BUDGET_MS = 1500
+
+def measure_imports(modules):
+    # Fresh interpreter so nothing is already cached in sys.modules; -X importtime reports on stderr
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', '; '.join(f'import {module}' for module in modules)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # "import time: self [us] | cumulative | imported package"; top-level imports are not indented
+    imported = set()
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imported.add(name.strip())
+        if not name.startswith('  '):
+            total_us += int(cumulative)
+    return imported, total_us / 1000
+
+def check_startup(budget_ms=DEFAULT_BUDGET_MS, modules=STARTUP_MODULES):
+    imported, total_ms = measure_imports(modules)
+    problems = []
+    for package in LAZY_PACKAGES:
+        eager = sorted(name for name in imported if name == package or name.startswith(package + '.'))
+        if eager:
+            problems.append(f"{package} is imported at startup ({eager[0]})")
+    if total_ms > budget_ms:
+        problems.append(f"cold start took {total_ms:.0f} ms, budget is {budget_ms} ms")
+    return total_ms, problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if cold-start imports regress (heavy packages loaded eagerly or over the time budget).")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum total import time in milliseconds")
+    args = parser.parse_args(argv)
+
+    total_ms, problems = check_startup(args.budget_ms)
+    print(f"Cold start: {total_ms:.0f} ms for {len(STARTUP_MODULES)} modules (budget {args.budget_ms:.0f} ms)")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
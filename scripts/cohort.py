@@ -0,0 +1,67 @@
+from contextlib import closing
+
+import pandas as pd
+
+from scripts.history_store import HISTORY_DB, connect
+from scripts.profiling import stage
+
+# Class/district views read only the rollup tables maintained by history_store on every save.
+# cohort=None aggregates every cohort (district-wide); buckets are session months (YYYY-MM).
+
+def _filters(cohort, start_bucket, end_bucket):
+    clauses, params = [], []
+    if cohort is not None:
+        clauses.append("cohort = ?")
+        params.append(cohort)
+    if start_bucket is not None:
+        clauses.append("bucket >= ?")
+        params.append(str(start_bucket)[:7])
+    if end_bucket is not None:
+        clauses.append("bucket <= ?")
+        params.append(str(end_bucket)[:7])
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def _query(sql, params, columns, db_path):
+    with closing(connect(db_path)) as conn:
+        return pd.DataFrame(conn.execute(sql, params).fetchall(), columns=columns)
+
+def list_cohorts(db_path=HISTORY_DB):
+    with closing(connect(db_path)) as conn:
+        return [cohort for (cohort,) in conn.execute("SELECT DISTINCT cohort FROM rollup_scores WHERE sessions > 0 ORDER BY cohort")]
+
+def list_buckets(cohort=None, db_path=HISTORY_DB):
+    query = "SELECT DISTINCT bucket FROM rollup_scores WHERE sessions > 0"
+    params = []
+    if cohort is not None:
+        query += " AND cohort = ?"
+        params.append(cohort)
+    with closing(connect(db_path)) as conn:
+        return [bucket for (bucket,) in conn.execute(query + " ORDER BY bucket", params)]
+
+@stage('cohort_top_topics')
+def top_weak_topics(k=10, cohort=None, start_bucket=None, end_bucket=None, db_path=HISTORY_DB):
+    where, params = _filters(cohort, start_bucket, end_bucket)
+    return _query(
+        "SELECT section, topic, SUM(mistakes) AS m, SUM(weighted_mistakes) AS w FROM rollup_topics" + where +
+        " GROUP BY section, topic HAVING m > 0 ORDER BY w DESC, section, topic LIMIT ?",
+        params + [k], ['Section', 'Topic', 'Mistakes', 'Weighted_Mistakes'], db_path
+    )
+
+@stage('cohort_domain_heatmap')
+def domain_heatmap(cohort=None, start_bucket=None, end_bucket=None, db_path=HISTORY_DB):
+    # Content_Domain x month matrix of mistakes (missing cells are 0)
+    where, params = _filters(cohort, start_bucket, end_bucket)
+    totals = _query(
+        "SELECT domain, bucket, SUM(mistakes) FROM rollup_domains" + where + " GROUP BY domain, bucket",
+        params, ['Content_Domain', 'Month', 'Mistakes'], db_path
+    )
+    return totals.pivot_table(index='Content_Domain', columns='Month', values='Mistakes', aggfunc='sum', fill_value=0)
+
+@stage('cohort_score_distribution')
+def score_distribution(cohort=None, start_bucket=None, end_bucket=None, db_path=HISTORY_DB):
+    # Sessions per total-score band (band = lower bound, e.g. 1200 covers 1200-1299)
+    where, params = _filters(cohort, start_bucket, end_bucket)
+    return _query(
+        "SELECT band, SUM(sessions) AS n FROM rollup_scores" + where + " GROUP BY band HAVING n > 0 ORDER BY band",
+        params, ['Score Band', 'Sessions'], db_path
+    )
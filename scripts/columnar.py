@@ -0,0 +1,96 @@
+import os
+import shutil
+from urllib.parse import quote
+
+import pandas as pd
+
+from scripts.data_analysis import REQUIRED_COLUMNS
+from scripts.profiling import stage
+
+PARQUET_MAGIC = b"PAR1"
+# Low-cardinality columns read as dictionary-encoded (pandas categoricals)
+DICTIONARY_COLUMNS = ['Section', 'Module', 'Topic', 'Difficulty']
+# Per-test analysis tables persisted for cohort queries
+ANALYSIS_TABLES = ['mistakes_by_topic', 'mistakes_by_domain', 'scores']
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet support requires pyarrow (pip install pyarrow)") from e
+
+def is_parquet(data):
+    return data[:4] == PARQUET_MAGIC
+
+def read_parquet_answers(source):
+    # Column projection: only the seven answer-sheet columns (and Form, which picks the scoring tables)
+    # are decoded, whatever else the export carries
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    with stage('parse_parquet') as parse_stage:
+        columns = pq.read_schema(source).names
+        for col in REQUIRED_COLUMNS:
+            if col not in columns:
+                raise ValueError(f"Missing required column: {col}")
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        wanted = REQUIRED_COLUMNS + ['Form'] if 'Form' in columns else REQUIRED_COLUMNS
+        df = pd.read_parquet(source, engine='pyarrow', columns=wanted, read_dictionary=DICTIONARY_COLUMNS)
+        # Dictionary order is first-seen order; sort it so groupby output is ordered like the CSV path
+        for col in DICTIONARY_COLUMNS:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+        parse_stage.rows = len(df)
+    return df
+
+def _partition_dir(root, table, student, date):
+    # Same layout pyarrow writes: hive partitions with URI-encoded values
+    return os.path.join(root, table, f"student={quote(str(student), safe='')}", f"date={quote(str(date), safe='')}")
+
+def save_analysis_parquet(analysis, root, student, date):
+    # root/<table>/student=<student>/date=<date>/ -- rewriting a session replaces its partition
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = {
+        'mistakes_by_topic': analysis['mistakes_by_topic'],
+        'mistakes_by_domain': analysis['mistakes_by_domain'],
+        'scores': pd.DataFrame([analysis['scores']])
+    }
+    with stage('save_parquet'):
+        for name, frame in tables.items():
+            # Drop the session's old partition first: an empty table writes no partition, so
+            # delete_matching alone would leave the previous upload's rows behind
+            shutil.rmtree(_partition_dir(root, name, student, date), ignore_errors=True)
+            frame = frame.reset_index(drop=True).assign(student=str(student), date=str(date))
+            # Plain strings on disk so partitions written from CSV and Parquet uploads share one schema
+            for col in frame.columns:
+                if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                    frame[col] = frame[col].astype(str)
+            pq.write_to_dataset(
+                pa.Table.from_pandas(frame, preserve_index=False),
+                os.path.join(root, name),
+                partition_cols=['student', 'date'],
+                existing_data_behavior='delete_matching',
+                basename_template='part-{i}.parquet'
+            )
+
+def load_analysis_parquet(root, table, students=None, start=None, end=None):
+    # Cohort scan over persisted tables; partition filters prune whole student/date directories
+    _require_pyarrow()
+    if table not in ANALYSIS_TABLES:
+        raise ValueError(f"Unknown analysis table: {table} (expected one of {', '.join(ANALYSIS_TABLES)})")
+    filters = []
+    if students is not None:
+        filters.append(('student', 'in', [str(student) for student in students]))
+    if start is not None:
+        filters.append(('date', '>=', str(start)))
+    if end is not None:
+        filters.append(('date', '<=', str(end)))
+    frame = pd.read_parquet(os.path.join(root, table), engine='pyarrow', filters=filters or None)
+    for col in ('student', 'date'):
+        # No files left (every saved session had an empty table): no partition columns either
+        frame[col] = frame[col].astype(str) if col in frame.columns else pd.Series(dtype=str)
+    return frame
@@ -1,58 +1,78 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-PERCENTILE_LOOKUP = {1600: 99, 1400: 95, 1200: 75, 1000: 50, 800: 25, 600: 5, 400: 1}
+from scripts.profiling import stage
+from scripts.scoring_model import DEFAULT_FORM, load_scoring_model
 
-def estimate_percentile(total_score):
-    for score, percentile in sorted(PERCENTILE_LOOKUP.items(), reverse=True):
-        if total_score >= score:
-            return percentile
-    return 1
+def estimate_percentiles(total_scores, form=DEFAULT_FORM):
+    return load_scoring_model(form).percentiles(total_scores)
 
-def calculate_scores(df):
-    df['Correct'] = df['Student_Answer'] == df['Correct_Answer']
-    rw_data = df[df['Section'] == 'Reading and Writing']
-    math_data = df[df['Section'] == 'Math']
-
-    rw_module1 = rw_data[rw_data['Module'] == 'Module 1']
-    rw_module2 = rw_data[rw_data['Module'] == 'Module 2']
-    math_module1 = math_data[math_data['Module'] == 'Module 1']
-    math_module2 = math_data[math_data['Module'] == 'Module 2']
+def estimate_percentile(total_score, form=DEFAULT_FORM):
+    return int(estimate_percentiles(total_score, form))
 
-    rw_correct_m1 = rw_module1['Correct'].sum()
-    rw_correct_m2 = rw_module2['Correct'].sum()
-    math_correct_m1 = math_module1['Correct'].sum()
-    math_correct_m2 = math_module2['Correct'].sum()
+def sheet_form(df):
+    # Test form named in an optional Form column (first value), else the default conversion
+    if 'Form' in df.columns:
+        forms = df['Form'].dropna()
+        if len(forms):
+            return str(forms.iloc[0])
+    return DEFAULT_FORM
 
-    rw_correct = rw_correct_m1 + rw_correct_m2
-    math_correct = math_correct_m1 + math_correct_m2
+def calculate_scores(df, form=DEFAULT_FORM):
+    df['Correct'] = df['Student_Answer'] == df['Correct_Answer']
+    counts = df.groupby(['Section', 'Module'], observed=True)['Correct'].agg(['sum', 'size'])
+    scores = scores_from_counts(counts.unstack(['Section', 'Module']).to_frame().T, form).iloc[0]
+    return {key: int(value) for key, value in scores.items()}
 
-    rw_scaled = 200 + (rw_correct / 54) * 600
-    math_scaled = 200 + (math_correct / 44) * 600
+SCORED_SECTIONS = ['Reading and Writing', 'Math']
+SCORED_MODULES = ['Module 1', 'Module 2']
 
-    rw_m1_accuracy = rw_correct_m1 / 27 if len(rw_module1) > 0 else 0
-    math_m1_accuracy = math_correct_m1 / 22 if len(math_module1) > 0 else 0
+def scores_from_counts(counts, form=DEFAULT_FORM):
+    # counts: one row per test, columns ('sum' | 'size', Section, Module) = correct / answered questions.
+    # form: one test form for every row, or one per row; each form's rows are scored by table lookup.
+    counts = counts.reindex(columns=pd.MultiIndex.from_product([['sum', 'size'], SCORED_SECTIONS, SCORED_MODULES]), fill_value=0)
+    correct = counts['sum'].to_numpy(dtype=np.int64)
+    answered = counts['size'].to_numpy(dtype=np.int64)
+    column = {key: i for i, key in enumerate(pd.MultiIndex.from_product([SCORED_SECTIONS, SCORED_MODULES]))}
+    section_correct = {section: correct[:, column[(section, 'Module 1')]] + correct[:, column[(section, 'Module 2')]] for section in SCORED_SECTIONS}
 
-    if rw_m1_accuracy >= 0.7:
-        rw_scaled += 50
-    if math_m1_accuracy >= 0.7:
-        math_scaled += 50
+    forms = np.full(len(counts), form, dtype=object) if isinstance(form, str) else np.asarray(form, dtype=object)
+    scaled = {section: np.zeros(len(counts), dtype=np.int64) for section in SCORED_SECTIONS}
+    percentile = np.zeros(len(counts), dtype=np.int64)
+    for name in pd.unique(forms):
+        rows = forms == name
+        model = load_scoring_model(name)
+        for section in SCORED_SECTIONS:
+            m1 = column[(section, 'Module 1')]
+            scaled[section][rows] = model.scale(section, section_correct[section][rows], correct[rows, m1], answered[rows, m1] > 0)
+        percentile[rows] = model.percentiles(scaled['Reading and Writing'][rows] + scaled['Math'][rows])
 
-    rw_scaled = min(800, max(200, int(rw_scaled)))
-    math_scaled = min(800, max(200, int(math_scaled)))
+    return pd.DataFrame({
+        'rw_correct': section_correct['Reading and Writing'],
+        'math_correct': section_correct['Math'],
+        'rw_scaled': scaled['Reading and Writing'],
+        'math_scaled': scaled['Math'],
+        'total_score': scaled['Reading and Writing'] + scaled['Math'],
+        'percentile': percentile
+    }, index=counts.index)
 
-    total_score = rw_scaled + math_scaled
-    percentile = estimate_percentile(total_score)
+def score_cohort(df, keys=('Student_ID', 'Test_ID'), form=None):
+    # Scores every test in one grouped pass; with a Form column (and no explicit form) each test
+    # is scored with its own form's conversion tables
+    keys = list(keys)
+    per_test_form = form is None and 'Form' in df.columns
+    if per_test_form:
+        keys = keys + ['Form']
+    for col in keys + ['Section', 'Module', 'Student_Answer', 'Correct_Answer']:
+        if col not in df.columns:
+            raise ValueError(f"Missing required column: {col}")
 
-    return {
-        'rw_correct': rw_correct,
-        'math_correct': math_correct,
-        'rw_scaled': rw_scaled,
-        'math_scaled': math_scaled,
-        'total_score': total_score,
-        'percentile': percentile
-    }
+    # One grouped pass: correct answers and answered questions per test, section and module
+    graded = df[keys + ['Section', 'Module']].assign(Correct=df['Student_Answer'] == df['Correct_Answer'])
+    counts = graded.groupby(keys + ['Section', 'Module'], observed=True)['Correct'].agg(['sum', 'size'])
+    counts = counts.unstack(['Section', 'Module'], fill_value=0)
+    forms = counts.index.get_level_values('Form') if per_test_form else (form or DEFAULT_FORM)
+    return scores_from_counts(counts, forms).reset_index()
 
 def map_to_content_domain(row):
     section = row['Section']
@@ -82,43 +102,72 @@ def map_to_content_domain(row):
             return "Unknown (Math)"
     return "Unknown"
 
-def analyze_mistakes(df):
-    # Ensure required columns exist
-    required_columns = ['Question_ID', 'Section', 'Module', 'Topic', 'Student_Answer', 'Correct_Answer', 'Difficulty']
-    for col in required_columns:
-        if col not in df.columns:
-            raise ValueError(f"Missing required column: {col}")
+# Same taxonomy as map_to_content_domain, flattened into a (Section, Topic) -> domain table
+# so whole columns can be mapped in one lookup instead of one Python call per row.
+CONTENT_DOMAINS = {
+    'Reading and Writing': {
+        'Information and Ideas': ['Central Ideas and Details', 'Command of Evidence (Textual)', 'Command of Evidence (Quantitative)', 'Inferences'],
+        'Craft and Structure': ['Words in Context', 'Text Structure and Purpose', 'Cross-Text Connections'],
+        'Expression of Ideas': ['Rhetorical Synthesis', 'Transitions'],
+        'Standard English Conventions': ['Boundaries', 'Form/Structure/Sense'],
+    },
+    'Math': {
+        'Algebra': ['Algebra'],
+        'Advanced Math': ['Advanced Math'],
+        'Problem-Solving and Data Analysis': ['Problem Solving and Data Analysis'],
+        'Geometry and Trigonometry': ['Geometry', 'Trigonometry'],
+    },
+}
+UNKNOWN_DOMAINS = {'Reading and Writing': "Unknown (Reading and Writing)", 'Math': "Unknown (Math)"}
+DOMAIN_LOOKUP = pd.Series({
+    (section, topic): domain
+    for section, domains in CONTENT_DOMAINS.items()
+    for domain, topics in domains.items()
+    for topic in topics
+})
 
-    df['Correct'] = df['Student_Answer'] == df['Correct_Answer']
+DIFFICULTY_LEVELS = ['Easy', 'Medium', 'Hard']
 
-    # Map topics to content domains
-    df['Content_Domain'] = df.apply(map_to_content_domain, axis=1)
+def map_content_domains(df):
+    keys = pd.MultiIndex.from_arrays([df['Section'], df['Topic']])
+    domains = pd.Series(DOMAIN_LOOKUP.reindex(keys).to_numpy(), index=df.index)
+    unknown = df['Section'].map(UNKNOWN_DOMAINS).fillna("Unknown")
+    return domains.fillna(unknown)
 
-    # Calculate scores (based on all questions)
-    scores = calculate_scores(df)
+def difficulty_codes(difficulty):
+    # Easy/Medium/Hard -> 1/2/3; anything else becomes NaN, like the dict .map() it replaces
+    codes = pd.Categorical(difficulty, categories=DIFFICULTY_LEVELS).codes + 1
+    return pd.Series(codes, index=difficulty.index, dtype=float).where(codes > 0)
 
-    # Filter to only include mistakes (where Correct is False) for mistake analysis
-    mistakes_df = df[df['Correct'] == False]
+ENGINES = ('apply', 'vectorized', 'compact')
 
-    if mistakes_df.empty:
-        # Return empty results if there are no mistakes
-        return {
-            'mistakes_by_section': pd.DataFrame(columns=['Section', 'Mistakes']),
-            'mistakes_by_topic': pd.DataFrame(columns=['Section', 'Topic', 'Module', 'Mistakes', 'Avg_Difficulty', 'Weighted_Mistakes']),
-            'mistakes_by_domain': pd.DataFrame(columns=['Section', 'Content_Domain', 'Module', 'Mistakes']),
-            'top_mistakes': pd.DataFrame(columns=['Section', 'Topic', 'Weighted_Mistakes']),
-            'scores': scores
-        }
+REQUIRED_COLUMNS = ['Question_ID', 'Section', 'Module', 'Topic', 'Student_Answer', 'Correct_Answer', 'Difficulty']
+
+def empty_analysis(scores):
+    return {
+        'mistakes_by_section': pd.DataFrame(columns=['Section', 'Mistakes']),
+        'mistakes_by_topic': pd.DataFrame(columns=['Section', 'Topic', 'Module', 'Mistakes', 'Avg_Difficulty', 'Weighted_Mistakes']),
+        'mistakes_by_domain': pd.DataFrame(columns=['Section', 'Content_Domain', 'Module', 'Mistakes']),
+        'top_mistakes': pd.DataFrame(columns=['Section', 'Topic', 'Weighted_Mistakes']),
+        'scores': scores
+    }
 
+def summarize_mistakes(mistakes_df, scores, engine='apply'):
     # Calculate mistakes by section
     mistakes_by_section = mistakes_df.groupby('Section')['Student_Answer'].count().reset_index()
     mistakes_by_section.columns = ['Section', 'Mistakes']
 
     # Calculate mistakes by topic
-    mistakes_by_topic = mistakes_df.groupby(['Section', 'Topic', 'Module']).agg({
-        'Student_Answer': 'count',
-        'Difficulty': lambda x: pd.Series(x).map({'Easy': 1, 'Medium': 2, 'Hard': 3}).mean()
-    }).reset_index()
+    if engine == 'vectorized':
+        mistakes_by_topic = mistakes_df.assign(Difficulty=difficulty_codes(mistakes_df['Difficulty'])).groupby(['Section', 'Topic', 'Module']).agg({
+            'Student_Answer': 'count',
+            'Difficulty': 'mean'
+        }).reset_index()
+    else:
+        mistakes_by_topic = mistakes_df.groupby(['Section', 'Topic', 'Module']).agg({
+            'Student_Answer': 'count',
+            'Difficulty': lambda x: pd.Series(x).map({'Easy': 1, 'Medium': 2, 'Hard': 3}).mean()
+        }).reset_index()
     mistakes_by_topic.columns = ['Section', 'Topic', 'Module', 'Mistakes', 'Avg_Difficulty']
     mistakes_by_topic['Weighted_Mistakes'] = mistakes_by_topic['Mistakes'] * mistakes_by_topic['Avg_Difficulty']
 
@@ -137,10 +186,328 @@ def analyze_mistakes(df):
         'scores': scores
     }
 
+def analyze_mistakes(df, engine='apply', form=None):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine} (expected one of {', '.join(ENGINES)})")
+
+    # Ensure required columns exist
+    for col in REQUIRED_COLUMNS:
+        if col not in df.columns:
+            raise ValueError(f"Missing required column: {col}")
+
+    form = form or sheet_form(df)
+    if engine == 'compact':
+        # Works on a narrow copy and leaves the caller's frame untouched
+        with stage('compact_answers', rows=len(df)):
+            compact = compact_answers(df)
+        with stage('groupbys_compact', rows=len(df)):
+            return analyze_compact(compact, form)
+
+    with stage('correct_flag', rows=len(df)):
+        df['Correct'] = df['Student_Answer'] == df['Correct_Answer']
+
+    # Map topics to content domains
+    with stage(f'domain_mapping_{engine}', rows=len(df)):
+        if engine == 'vectorized':
+            df['Content_Domain'] = map_content_domains(df)
+        else:
+            df['Content_Domain'] = df.apply(map_to_content_domain, axis=1)
+
+    # Calculate scores (based on all questions)
+    with stage('scoring', rows=len(df)):
+        scores = calculate_scores(df, form)
+
+    # Filter to only include mistakes (where Correct is False) for mistake analysis
+    mistakes_df = df[df['Correct'] == False]
+
+    if mistakes_df.empty:
+        # Return empty results if there are no mistakes
+        return empty_analysis(scores)
+
+    with stage(f'groupbys_{engine}', rows=len(mistakes_df)):
+        return summarize_mistakes(mistakes_df, scores, engine)
+
+CHUNK_SIZE = 250_000
+
+# Narrow dtypes for streamed reads: the fixed taxonomies as categoricals, answers as plain strings
+# so every chunk compares them the same way regardless of what pandas would infer per chunk.
+STREAM_DTYPES = {
+    'Section': 'category',
+    'Module': 'category',
+    'Topic': 'category',
+    'Difficulty': 'category',
+    'Student_Answer': str,
+    'Correct_Answer': str,
+    'Form': str
+}
+
+def _partial_aggregates(chunk):
+    correct = chunk['Student_Answer'] == chunk['Correct_Answer']
+    score_counts = chunk[['Section', 'Module']].assign(Correct=correct).groupby(['Section', 'Module'], observed=True)['Correct'].agg(['sum', 'size'])
+
+    # Mistakes at the finest grain every result table can be rolled up from. NaN keys are kept
+    # so the section and domain totals still count rows with a missing Topic or Module.
+    mistakes = chunk[~correct]
+    codes = difficulty_codes(mistakes['Difficulty'])
+    topic_counts = mistakes[['Section', 'Topic', 'Module', 'Student_Answer']].assign(Difficulty_Sum=codes, Difficulty_Count=codes).groupby(
+        ['Section', 'Topic', 'Module'], observed=True, dropna=False
+    ).agg({'Student_Answer': 'count', 'Difficulty_Sum': 'sum', 'Difficulty_Count': 'count'})
+    topic_counts.columns = ['Mistakes', 'Difficulty_Sum', 'Difficulty_Count']
+
+    # Chunks carry different category sets, so merge on plain values
+    score_counts.index = pd.MultiIndex.from_tuples(score_counts.index.to_list(), names=score_counts.index.names)
+    topic_counts.index = pd.MultiIndex.from_tuples(topic_counts.index.to_list(), names=topic_counts.index.names)
+    return score_counts, topic_counts
+
+def _merge_partials(total, partial):
+    if total is None:
+        return partial
+    return pd.concat([total, partial]).groupby(level=list(range(partial.index.nlevels)), dropna=False).sum()
+
+def analyze_mistakes_chunked(path, chunksize=CHUNK_SIZE, prepare=None, form=None):
+    # prepare: optional callable applied to each chunk before aggregation (e.g. validation.StreamValidator).
+    # Without an explicit form the first value of the sheet's Form column is used, as in analyze_mistakes
+    header = pd.read_csv(path, nrows=0).columns
+    for col in REQUIRED_COLUMNS:
+        if col not in header:
+            raise ValueError(f"Missing required column: {col}")
+
+    # Only the running aggregates live across chunks, so peak memory follows chunksize, not file size
+    score_counts = None
+    topic_counts = None
+    usecols = [col for col in REQUIRED_COLUMNS if col != 'Question_ID']
+    if prepare is not None:
+        # Checks on Question_ID need it, and the sheet keys of multi-student files
+        usecols = [col for col in ('Student_ID', 'Test_ID') if col in header] + REQUIRED_COLUMNS
+    if 'Form' in header:
+        usecols = usecols + ['Form']
+    with stage('chunked_read_aggregate') as read_stage:
+        read_stage.rows = 0
+        for chunk in pd.read_csv(path, usecols=usecols, dtype=STREAM_DTYPES, chunksize=chunksize):
+            read_stage.rows += len(chunk)
+            if prepare is not None:
+                chunk = prepare(chunk)
+            if form is None and 'Form' in chunk.columns and chunk['Form'].notna().any():
+                form = sheet_form(chunk)
+            chunk_scores, chunk_topics = _partial_aggregates(chunk)
+            score_counts = _merge_partials(score_counts, chunk_scores)
+            topic_counts = _merge_partials(topic_counts, chunk_topics)
+
+    return analysis_from_counts(score_counts, topic_counts, form or DEFAULT_FORM)
+
+def analysis_from_counts(score_counts, topic_counts, form=DEFAULT_FORM):
+    # score_counts: correct/answered per (Section, Module); topic_counts: Mistakes, Difficulty_Sum and
+    # Difficulty_Count per (Section, Topic, Module), NaN keys included. Both may be None.
+    if score_counts is None:
+        score_counts = pd.DataFrame(columns=['sum', 'size'], index=pd.MultiIndex.from_tuples([], names=['Section', 'Module']))
+    scores = scores_from_counts(score_counts.unstack(['Section', 'Module']).to_frame().T, form).iloc[0]
+    scores = {key: int(value) for key, value in scores.items()}
+
+    if topic_counts is None or topic_counts.empty:
+        return empty_analysis(scores)
+    topic_counts = topic_counts.reset_index()
+    # Categorical keys become plain values so every engine returns the same frames
+    for col in ['Section', 'Topic', 'Module']:
+        if isinstance(topic_counts[col].dtype, pd.CategoricalDtype):
+            topic_counts[col] = topic_counts[col].astype(object)
+    topic_counts = topic_counts.infer_objects()
+
+    mistakes_by_section = topic_counts.groupby('Section')['Mistakes'].sum().reset_index()
+
+    mistakes_by_topic = topic_counts.groupby(['Section', 'Topic', 'Module'])[['Mistakes', 'Difficulty_Sum', 'Difficulty_Count']].sum().reset_index()
+    mistakes_by_topic['Avg_Difficulty'] = mistakes_by_topic['Difficulty_Sum'] / mistakes_by_topic['Difficulty_Count']
+    mistakes_by_topic = mistakes_by_topic[['Section', 'Topic', 'Module', 'Mistakes', 'Avg_Difficulty']]
+    mistakes_by_topic['Weighted_Mistakes'] = mistakes_by_topic['Mistakes'] * mistakes_by_topic['Avg_Difficulty']
+
+    topic_counts['Content_Domain'] = map_content_domains(topic_counts)
+    mistakes_by_domain = topic_counts.groupby(['Section', 'Content_Domain', 'Module'])['Mistakes'].sum().reset_index()
+
+    top_mistakes = mistakes_by_topic.sort_values(by='Weighted_Mistakes', ascending=False).head(5)
+
+    return {
+        'mistakes_by_section': mistakes_by_section,
+        'mistakes_by_topic': mistakes_by_topic,
+        'mistakes_by_domain': mistakes_by_domain,
+        'top_mistakes': top_mistakes,
+        'scores': scores
+    }
+
+def compact_answers(df):
+    # Narrow representation of an answer sheet: categoricals for the fixed taxonomies (sorted, so
+    # groupby order matches the string columns), int8 difficulty codes (1-3, 0 = unrecognized),
+    # and booleans in place of the two answer columns.
+    section = pd.Categorical(df['Section'])
+    topic = pd.Categorical(df['Topic'])
+
+    # Content domain depends only on (Section, Topic): map each distinct pair once, then broadcast
+    n_topics = len(topic.categories) + 1
+    pair_codes, pairs = pd.factorize((section.codes.astype(np.int64) + 1) * n_topics + (topic.codes.astype(np.int64) + 1))
+    pair_sections = np.asarray(pairs // n_topics - 1)
+    pair_topics = np.asarray(pairs % n_topics - 1)
+    pair_frame = pd.DataFrame({
+        'Section': pd.Categorical.from_codes(pair_sections, section.categories),
+        'Topic': pd.Categorical.from_codes(pair_topics, topic.categories)
+    }).astype(object)
+    pair_domains = pd.Categorical(map_content_domains(pair_frame))
+    domain = pd.Categorical.from_codes(pair_domains.codes[pair_codes], pair_domains.categories)
+
+    return pd.DataFrame({
+        'Question_ID': df['Question_ID'],
+        'Section': section,
+        'Module': pd.Categorical(df['Module']),
+        'Topic': topic,
+        'Content_Domain': domain,
+        'Difficulty': (pd.Categorical(df['Difficulty'], categories=DIFFICULTY_LEVELS).codes + 1).astype(np.int8),
+        'Answered': df['Student_Answer'].notna().to_numpy(),
+        'Correct': (df['Student_Answer'] == df['Correct_Answer']).to_numpy()
+    }, index=df.index)
+
+def compact_counts(compact):
+    # Aggregates over every row with the mistake mask as weights instead of copying the mistake subset.
+    # topic_counts keeps every observed group plus Mistake_Rows (rows answered wrong or left blank).
+    correct = compact['Correct'].to_numpy()
+    mistake = ~correct
+    difficulty = compact['Difficulty'].to_numpy()
+
+    score_counts = pd.Series(correct, index=compact.index).groupby([compact['Section'], compact['Module']], observed=True).agg(['sum', 'size'])
+
+    masked = pd.DataFrame({
+        'Mistake_Rows': mistake,
+        'Mistakes': mistake & compact['Answered'].to_numpy(),
+        'Difficulty_Sum': np.where(mistake, difficulty, 0).astype(np.int8),
+        'Difficulty_Count': mistake & (difficulty > 0)
+    }, index=compact.index)
+    topic_counts = masked.groupby([compact['Section'], compact['Topic'], compact['Module']], observed=True, dropna=False).sum()
+    return score_counts, topic_counts
+
+def analyze_compact(compact, form=DEFAULT_FORM):
+    score_counts, topic_counts = compact_counts(compact)
+    topic_counts = topic_counts[topic_counts['Mistake_Rows'] > 0].drop(columns='Mistake_Rows')
+    return analysis_from_counts(score_counts, topic_counts, form)
+
+# Incremental re-analysis. The answer state of an analyzed sheet is its compact per-question frame
+# (indexed by Question_ID) plus the running counts analysis_from_counts works from. A re-upload is
+# diffed against it by Question_ID and only the changed questions are re-aggregated: their old
+# contribution is subtracted from the counts and the new one added. Anything the diff can't be
+# trusted for (different columns or dtypes, missing/duplicate Question_IDs, an older state format)
+# falls back to a full rebuild.
+STATE_VERSION = 1
+STATE_COLUMNS = ['Section', 'Module', 'Topic', 'Difficulty', 'Answered', 'Correct']
+
+def answer_schema(df):
+    return [STATE_VERSION, [str(col) for col in df.columns], [str(df[col].dtype) for col in REQUIRED_COLUMNS]]
+
+def _plain_counts(score_counts, topic_counts):
+    # Plain-valued keys so counts from different sheets (different category sets) line up
+    score_counts.index = pd.MultiIndex.from_tuples(score_counts.index.to_list(), names=['Section', 'Module'])
+    topic_counts.index = pd.MultiIndex.from_tuples(topic_counts.index.to_list(), names=['Section', 'Topic', 'Module'])
+    return score_counts, topic_counts
+
+def _state_counts(questions):
+    if questions.empty:
+        return None, None
+    return _plain_counts(*compact_counts(questions))
+
+def _changed_questions(old, new):
+    # Question_IDs added, removed, or with any per-question field changed
+    ids = old.index.union(new.index)
+    old_values = old[STATE_COLUMNS].astype(object).reindex(ids)
+    new_values = new[STATE_COLUMNS].astype(object).reindex(ids)
+    same = (old_values == new_values) | (old_values.isna() & new_values.isna())
+    return ids[~same.all(axis=1).to_numpy()]
+
+def _apply_delta(total, removed, added):
+    for partial, sign in ((removed, -1), (added, 1)):
+        if partial is not None:
+            total = _merge_partials(total, partial * sign)
+    return total
+
+def analyze_incremental(df, previous=None, form=None):
+    # Returns (analysis, state); state['changed'] is the number of re-aggregated questions, or None
+    # after a full rebuild. The analysis equals analyze_mistakes(df, engine='compact').
+    for col in REQUIRED_COLUMNS:
+        if col not in df.columns:
+            raise ValueError(f"Missing required column: {col}")
+    schema = answer_schema(df)
+    with stage('compact_answers', rows=len(df)):
+        questions = compact_answers(df).drop(columns='Content_Domain').set_index('Question_ID')
+
+    ids_usable = questions.index.notna().all() and questions.index.is_unique
+    if previous is not None and ids_usable and previous['schema'] == schema:
+        with stage('incremental_diff', rows=len(df)) as diff_stage:
+            changed = _changed_questions(previous['questions'], questions)
+            diff_stage.rows = len(changed)
+            removed = _state_counts(previous['questions'].loc[previous['questions'].index.intersection(changed)])
+            added = _state_counts(questions.loc[questions.index.intersection(changed)])
+            score_counts = _apply_delta(previous['score_counts'], removed[0], added[0])
+            topic_counts = _apply_delta(previous['topic_counts'], removed[1], added[1])
+            # Groups whose last question moved elsewhere drop out, as they would in a rebuild
+            score_counts = score_counts[score_counts['size'] > 0]
+            topic_counts = topic_counts[topic_counts['Mistake_Rows'] > 0]
+    else:
+        changed = None
+        with stage('groupbys_compact', rows=len(df)):
+            score_counts, topic_counts = _state_counts(questions)
+            if topic_counts is not None:
+                topic_counts = topic_counts[topic_counts['Mistake_Rows'] > 0]
+
+    state = {'schema': schema, 'questions': questions, 'score_counts': score_counts, 'topic_counts': topic_counts, 'changed': changed if changed is None else len(changed)}
+    if not ids_usable:
+        # No stable key to diff the next upload against
+        state['schema'] = None
+    topic_counts = None if topic_counts is None else topic_counts.drop(columns='Mistake_Rows')
+    analysis = analysis_from_counts(score_counts, topic_counts, form or sheet_form(df))
+    return analysis, state
+
+def answer_state_to_dict(state):
+    # JSON-ready form for the history store
+    def records(frame):
+        return None if frame is None else frame.reset_index().to_dict(orient='list')
+    return {
+        'schema': state['schema'],
+        'questions': records(state['questions'].astype({'Section': object, 'Module': object, 'Topic': object})),
+        'score_counts': records(state['score_counts']),
+        'topic_counts': records(state['topic_counts'])
+    }
+
+def answer_state_from_dict(data):
+    def frame(records, keys):
+        return None if records is None else pd.DataFrame(records).set_index(keys)
+    questions = frame(data['questions'], 'Question_ID')
+    questions = questions.astype({'Difficulty': np.int8, 'Answered': bool, 'Correct': bool})
+    return {
+        'schema': data['schema'],
+        'questions': questions,
+        'score_counts': frame(data['score_counts'], ['Section', 'Module']),
+        'topic_counts': frame(data['topic_counts'], ['Section', 'Topic', 'Module'])
+    }
+
+def memory_footprint(df):
+    # Deep memory of the frame analyze_mistakes builds up in place ('vectorized' engine: the upload plus
+    # Correct and Content_Domain, and the copied mistake subset) next to the compact representation, in bytes
+    analyzed = df.copy()
+    analyze_mistakes(analyzed, engine='vectorized')
+    mistakes_copy = analyzed[analyzed['Correct'] == False]
+    return {
+        'object_frame': int(analyzed.memory_usage(deep=True).sum()),
+        'mistakes_copy': int(mistakes_copy.memory_usage(deep=True).sum()),
+        'compact_frame': int(compact_answers(df).memory_usage(deep=True).sum())
+    }
+
 def plot_mistakes_by_type(mistakes_by_domain):
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=mistakes_by_domain, x='Content_Domain', y='Mistakes', hue='Section', style='Module', palette="Blues_r")
-    plt.title("Mistakes by Content Domain Across Sections and Modules")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    return plt.gcf()
\ No newline at end of file
+    # Plotting stack is imported on first use so analysis-only callers never load it
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Explicit figure instead of pyplot's global current figure; the caller owns it and must plt.close() it
+    # (barplot has no style= argument; Module is summed into each bar)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        sns.barplot(data=mistakes_by_domain, x='Content_Domain', y='Mistakes', hue='Section', estimator='sum', errorbar=None, palette="Blues_r", ax=ax)
+        ax.set_title("Mistakes by Content Domain Across Sections and Modules")
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.tight_layout()
+    except Exception:
+        plt.close(fig)
+        raise
+    return fig
\ No newline at end of file
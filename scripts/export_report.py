@@ -1,25 +1,126 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-
-def export_pdf(student_name, analysis, plan):
-    pdf_file = f"{student_name}_SAT_Analysis.pdf"
-    doc = SimpleDocTemplate(pdf_file, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from scripts.profiling import stage
+
+# Path separators, characters Windows forbids, quotes and control characters (incl. CR/LF)
+_UNSAFE_FILENAME = re.compile(r'[\x00-\x1f\x7f"\\/:*?<>|]+')
+
+def report_file_name(student_name):
+    # Student names come from uploads and query strings: safe to join onto a directory and to put in a header
+    name = _UNSAFE_FILENAME.sub('_', str(student_name)).strip(' .') or "Student"
+    return f"{name}_SAT_Analysis.pdf"
+
+@lru_cache(maxsize=1)
+def _templates():
+    # reportlab is only loaded when a report is actually requested; styles are built once per process
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d3d3d3')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f7fa')]),
+    ])
+    return getSampleStyleSheet(), table_style
+
+def _table(rows, table_style):
+    from reportlab.platypus import Table
+
+    table = Table([[str(value) for value in row] for row in rows], hAlign='LEFT')
+    table.setStyle(table_style)
+    return table
+
+def _frame_rows(frame, columns):
+    return [columns] + [list(row) for row in frame[columns].itertuples(index=False)]
+
+def _domain_chart(mistakes_by_domain):
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+
+    totals = mistakes_by_domain.groupby('Content_Domain')['Mistakes'].sum().sort_values()
+    height = 40 + 22 * len(totals)
+    drawing = Drawing(450, height)
+    chart = HorizontalBarChart()
+    chart.x, chart.y = 160, 20
+    chart.width, chart.height = 270, height - 30
+    chart.data = [[int(value) for value in totals.values]]
+    chart.categoryAxis.categoryNames = [str(domain) for domain in totals.index]
+    chart.categoryAxis.labels.fontSize = 8
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontSize = 8
+    chart.bars[0].fillColor = colors.HexColor('#3498db')
+    drawing.add(chart)
+    return drawing
+
+def build_elements(student_name, analysis, plan):
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles, table_style = _templates()
+    scores = analysis['scores']
     elements = []
-    
-    elements.append(Paragraph(f"SAT Mistake Analysis for {student_name}", styles['Heading1']))
+
+    elements.append(Paragraph(f"SAT Mistake Analysis for {escape(student_name)}", styles['Heading1']))
     elements.append(Spacer(1, 12))
-    
+
     elements.append(Paragraph("Current Scores", styles['Heading2']))
-    elements.append(Paragraph(f"Total Score: {analysis['scores']['total_score']}", styles['Normal']))
-    elements.append(Paragraph(f"Reading and Writing: {analysis['scores']['rw_scaled']}", styles['Normal']))
-    elements.append(Paragraph(f"Math: {analysis['scores']['math_scaled']}", styles['Normal']))
+    elements.append(Paragraph(f"Total Score: {scores['total_score']} ({scores['percentile']}th percentile)", styles['Normal']))
+    elements.append(Spacer(1, 6))
+    elements.append(_table([
+        ['Section', 'Scaled Score', 'Correct Answers'],
+        ['Reading and Writing', scores['rw_scaled'], scores['rw_correct']],
+        ['Math', scores['math_scaled'], scores['math_correct']],
+    ], table_style))
     elements.append(Spacer(1, 12))
-    
+
+    if not analysis['mistakes_by_domain'].empty:
+        elements.append(Paragraph("Mistakes by Content Domain", styles['Heading2']))
+        elements.append(_domain_chart(analysis['mistakes_by_domain']))
+        elements.append(_table(_frame_rows(analysis['mistakes_by_domain'], ['Section', 'Content_Domain', 'Module', 'Mistakes']), table_style))
+        elements.append(Spacer(1, 12))
+
+    if not analysis['top_mistakes'].empty:
+        elements.append(Paragraph("Top Weaknesses (Weighted by Difficulty)", styles['Heading2']))
+        top_mistakes = analysis['top_mistakes'].assign(Weighted_Mistakes=analysis['top_mistakes']['Weighted_Mistakes'].round(2))
+        elements.append(_table(_frame_rows(top_mistakes, ['Section', 'Topic', 'Weighted_Mistakes']), table_style))
+        elements.append(Spacer(1, 12))
+
     elements.append(Paragraph("Study Plan", styles['Heading2']))
-    elements.append(Paragraph(plan.replace('\n', '<br/>'), styles['Normal']))
-    
-    doc.build(elements)
-    return pdf_file
\ No newline at end of file
+    elements.append(Paragraph(escape(plan).replace('\n', '<br/>'), styles['Normal']))
+    return elements
+
+@stage('pdf')
+def render_pdf(student_name, analysis, plan):
+    # Rendered in memory so callers (e.g. the Streamlit download button) need no file round-trip
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, title=f"SAT Mistake Analysis for {student_name}")
+    doc.build(build_elements(student_name, analysis, plan))
+    return buffer.getvalue()
+
+def export_pdf(student_name, analysis, plan, output_dir=""):
+    pdf_file = os.path.join(output_dir, report_file_name(student_name))
+    with open(pdf_file, "wb") as f:
+        f.write(render_pdf(student_name, analysis, plan))
+    return pdf_file
+
+def _export_job(job):
+    student_name, analysis, plan, output_dir = job
+    return export_pdf(student_name, analysis, plan, output_dir)
+
+def export_pdfs(reports, output_dir="", workers=None):
+    # reports: iterable of (student_name, analysis, plan); rendered across worker processes
+    jobs = [(student_name, analysis, plan, output_dir) for student_name, analysis, plan in reports]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_export_job, jobs, chunksize=max(1, len(jobs) // 64)))
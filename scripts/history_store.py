@@ -0,0 +1,441 @@
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import warnings
+from contextlib import closing, contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+HISTORY_DB = "history.db"
+HISTORY_JSON = "history.json"
+
+SCHEMA_VERSION = 4
+
+SESSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    student TEXT NOT NULL,
+    date TEXT NOT NULL,
+    results TEXT NOT NULL,
+    PRIMARY KEY (student, date)
+) WITHOUT ROWID
+"""
+
+# One row per session with everything the Progress tab plots, kept up to date on every save
+TRENDS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trends (
+    student TEXT NOT NULL,
+    date TEXT NOT NULL,
+    total_score INTEGER,
+    rw_scaled INTEGER,
+    math_scaled INTEGER,
+    percentile INTEGER,
+    total_mistakes INTEGER,
+    domain_mistakes TEXT NOT NULL,
+    score_change INTEGER,
+    mistake_change INTEGER,
+    PRIMARY KEY (student, date)
+) WITHOUT ROWID
+"""
+
+# Diffs against the previous session of the same student (NULL for the first one)
+TREND_CHANGES = """
+UPDATE trends SET
+    score_change = total_score - (
+        SELECT p.total_score FROM trends p WHERE p.student = trends.student AND p.date < trends.date ORDER BY p.date DESC LIMIT 1
+    ),
+    mistake_change = total_mistakes - (
+        SELECT p.total_mistakes FROM trends p WHERE p.student = trends.student AND p.date < trends.date ORDER BY p.date DESC LIMIT 1
+    )
+"""
+
+# Cohort rollups, updated with each saved session's contribution (old contribution subtracted on
+# overwrite) so class/district dashboards never have to re-read individual sessions.
+# cohort '' = students not assigned to a class; bucket = session month (YYYY-MM).
+COHORT_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS students (
+        student TEXT PRIMARY KEY,
+        cohort TEXT NOT NULL DEFAULT ''
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_topics (
+        cohort TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        section TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        mistakes INTEGER NOT NULL,
+        weighted_mistakes REAL NOT NULL,
+        PRIMARY KEY (cohort, bucket, section, topic)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_domains (
+        cohort TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        domain TEXT NOT NULL,
+        mistakes INTEGER NOT NULL,
+        PRIMARY KEY (cohort, bucket, domain)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_scores (
+        cohort TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        band INTEGER NOT NULL,
+        sessions INTEGER NOT NULL,
+        PRIMARY KEY (cohort, bucket, band)
+    ) WITHOUT ROWID
+    """
+]
+SCORE_BAND = 100
+
+# Per-question state of the last analyzed upload per student/date (data_analysis.answer_state_to_dict),
+# so a re-upload of an edited sheet can be re-analyzed incrementally
+ANSWER_STATES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answer_states (
+    student TEXT NOT NULL,
+    date TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (student, date)
+) WITHOUT ROWID
+"""
+
+def _to_json(value):
+    # Scores come out of pandas as numpy scalars, which json can't serialize on its own
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_results(results):
+    return json.dumps(results, default=_to_json, separators=(',', ':'))
+
+def connect(db_path=HISTORY_DB):
+    # WAL lets readers run alongside a writer; busy timeout makes concurrent writers queue instead of failing
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        _upgrade_schema(conn)
+    return conn
+
+def _upgrade_schema(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-check under the write lock: another process may have upgraded in the meantime
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            conn.execute(SESSIONS_SCHEMA)
+        if version < 2:
+            conn.execute(TRENDS_SCHEMA)
+            rows = conn.execute("SELECT student, date, results FROM sessions").fetchall()
+            conn.executemany("INSERT OR REPLACE INTO trends VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)",
+                             [_trend_row(student, date, json.loads(results)) for student, date, results in rows])
+            conn.execute(TREND_CHANGES)
+        if version < 3:
+            for statement in COHORT_SCHEMA:
+                conn.execute(statement)
+            for student, date, results in conn.execute("SELECT student, date, results FROM sessions").fetchall():
+                _apply_rollups(conn, '', date, json.loads(results), 1)
+        if version < 4:
+            conn.execute(ANSWER_STATES_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def session_date(value):
+    # Sessions are keyed by ISO date: trends sort on it, rollups bucket on its YYYY-MM prefix and the
+    # history-based plans parse it, so anything else is rejected before it reaches the store
+    try:
+        return datetime.date.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        raise ValueError(f"Session date must be YYYY-MM-DD, got {value!r}") from None
+
+def _trend_row(student, date, results):
+    scores = results['scores']
+    return (
+        student, str(date),
+        scores['total_score'], scores['rw_scaled'], scores['math_scaled'], scores['percentile'],
+        sum(results['mistakes'].values()),
+        dumps_results(results['mistakes_by_domain'])
+    )
+
+def _update_trend(conn, student, date, results):
+    conn.execute("INSERT OR REPLACE INTO trends VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)", _trend_row(student, date, results))
+    # Only this session's diff and the next session's diff can change
+    next_date = conn.execute("SELECT MIN(date) FROM trends WHERE student = ? AND date > ?", (student, str(date))).fetchone()[0]
+    conn.execute(TREND_CHANGES + " WHERE student = ? AND date IN (?, ?)", (student, str(date), next_date))
+
+def _rollup_topics(results):
+    # (section, topic, mistakes, weighted) per topic; sessions saved before weighted topics were
+    # recorded only have per-topic counts, which count with weight 1 under an empty section
+    if 'topics' in results:
+        return [(section, topic, values['mistakes'], values['weighted'])
+                for section, topics in results['topics'].items() for topic, values in topics.items()]
+    return [('', topic, mistakes, mistakes) for topic, mistakes in results['mistakes'].items()]
+
+def _apply_rollups(conn, cohort, date, results, sign):
+    # Add (sign=1) or remove (sign=-1) one session's contribution to its cohort's rollups
+    bucket = str(date)[:7]
+    conn.executemany(
+        "INSERT INTO rollup_topics VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (cohort, bucket, section, topic) "
+        "DO UPDATE SET mistakes = mistakes + excluded.mistakes, weighted_mistakes = weighted_mistakes + excluded.weighted_mistakes",
+        [(cohort, bucket, section, topic, sign * mistakes, sign * weighted) for section, topic, mistakes, weighted in _rollup_topics(results)]
+    )
+    conn.executemany(
+        "INSERT INTO rollup_domains VALUES (?, ?, ?, ?) ON CONFLICT (cohort, bucket, domain) "
+        "DO UPDATE SET mistakes = mistakes + excluded.mistakes",
+        [(cohort, bucket, domain, sign * mistakes) for domain, mistakes in results['mistakes_by_domain'].items()]
+    )
+    band = int(results['scores']['total_score']) // SCORE_BAND * SCORE_BAND
+    conn.execute(
+        "INSERT INTO rollup_scores VALUES (?, ?, ?, ?) ON CONFLICT (cohort, bucket, band) "
+        "DO UPDATE SET sessions = sessions + excluded.sessions",
+        (cohort, bucket, band, sign)
+    )
+
+def _student_cohort(conn, student):
+    row = conn.execute("SELECT cohort FROM students WHERE student = ?", (student,)).fetchone()
+    return row[0] if row else ''
+
+def _index_session(conn, student, date, results, old_results=None):
+    # Keep the derived tables (trends, cohort rollups) in step with one saved session
+    _update_trend(conn, student, date, results)
+    cohort = _student_cohort(conn, student)
+    if old_results is not None:
+        _apply_rollups(conn, cohort, date, old_results, -1)
+    _apply_rollups(conn, cohort, date, results, 1)
+
+def save_sessions(sessions, db_path=HISTORY_DB):
+    # Bulk upsert of (student, date, results) tuples in a single transaction. The write lock is
+    # taken up front so the old results read for the rollup deltas can't change underneath us.
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for student, date, results in sessions:
+            date = session_date(date)
+            results = json.loads(dumps_results(results))
+            old = conn.execute("SELECT results FROM sessions WHERE student = ? AND date = ?", (student, str(date))).fetchone()
+            conn.execute(
+                "INSERT INTO sessions (student, date, results) VALUES (?, ?, ?) "
+                "ON CONFLICT (student, date) DO UPDATE SET results = excluded.results",
+                (student, str(date), dumps_results(results))
+            )
+            _index_session(conn, student, date, results, json.loads(old[0]) if old else None)
+
+def set_student_cohort(student, cohort, db_path=HISTORY_DB):
+    # Move a student (and all of their sessions' rollup contributions) into a class/cohort
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        old_cohort = _student_cohort(conn, student)
+        if old_cohort != cohort:
+            for date, results in conn.execute("SELECT date, results FROM sessions WHERE student = ?", (student,)).fetchall():
+                results = json.loads(results)
+                _apply_rollups(conn, old_cohort, date, results, -1)
+                _apply_rollups(conn, cohort, date, results, 1)
+        conn.execute(
+            "INSERT INTO students (student, cohort) VALUES (?, ?) ON CONFLICT (student) DO UPDATE SET cohort = excluded.cohort",
+            (student, cohort)
+        )
+
+def rebuild_rollups(db_path=HISTORY_DB):
+    # Recompute the cohort rollups from scratch out of sessions + students (repairs drift after
+    # manual edits to the store); readers keep seeing the old rollups until the commit
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for table in ('rollup_topics', 'rollup_domains', 'rollup_scores'):
+            conn.execute(f"DELETE FROM {table}")
+        cohorts = dict(conn.execute("SELECT student, cohort FROM students").fetchall())
+        rows = conn.execute("SELECT student, date, results FROM sessions").fetchall()
+        for student, date, results in rows:
+            _apply_rollups(conn, cohorts.get(student, ''), date, json.loads(results), 1)
+    return len(rows)
+
+def save_session(student, date, results, db_path=HISTORY_DB):
+    save_sessions([(student, date, results)], db_path)
+
+def session_results(analysis):
+    # What gets stored per session for the Progress tab and the cohort rollups
+    by_topic = analysis['mistakes_by_topic'].groupby(['Section', 'Topic'])[['Mistakes', 'Weighted_Mistakes']].sum()
+    topics = {}
+    for (section, topic), row in by_topic.iterrows():
+        topics.setdefault(section, {})[topic] = {'mistakes': int(row['Mistakes']), 'weighted': float(row['Weighted_Mistakes'])}
+    return {
+        'mistakes': dict(zip(analysis['mistakes_by_topic']["Topic"], analysis['mistakes_by_topic']["Mistakes"])),
+        'scores': analysis['scores'],
+        'mistakes_by_domain': analysis['mistakes_by_domain'].groupby('Content_Domain')['Mistakes'].sum().to_dict(),
+        'topics': topics
+    }
+
+def save_answer_state(student, date, state, db_path=HISTORY_DB):
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute(
+            "INSERT INTO answer_states (student, date, state) VALUES (?, ?, ?) "
+            "ON CONFLICT (student, date) DO UPDATE SET state = excluded.state",
+            (student, session_date(date), dumps_results(state))
+        )
+
+def load_answer_state(student, date, db_path=HISTORY_DB):
+    with closing(connect(db_path)) as conn:
+        row = conn.execute("SELECT state FROM answer_states WHERE student = ? AND date = ?", (student, str(date))).fetchone()
+    return json.loads(row[0]) if row else None
+
+def load_history(student, start=None, end=None, db_path=HISTORY_DB):
+    query = "SELECT date, results FROM sessions WHERE student = ?"
+    params = [student]
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(str(start))
+    if end is not None:
+        query += " AND date <= ?"
+        params.append(str(end))
+    query += " ORDER BY date"
+    with closing(connect(db_path)) as conn:
+        return {date: json.loads(results) for date, results in conn.execute(query, params)}
+
+def load_trends(student, db_path=HISTORY_DB):
+    # Materialized Progress tab data: (trends_df, domain_trends_df), both with a Date column
+    with closing(connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT date, total_score, rw_scaled, math_scaled, percentile, total_mistakes, score_change, mistake_change, domain_mistakes "
+            "FROM trends WHERE student = ? ORDER BY date", (student,)
+        ).fetchall()
+    trends_df = pd.DataFrame([row[:8] for row in rows], columns=[
+        'Date', 'Total Score', 'Reading and Writing Score', 'Math Score', 'Percentile', 'Total Mistakes', 'Score Change', 'Mistake Change'
+    ])
+    # First session has no previous one: NULL -> NaN, as .diff() gave before the trends table
+    trends_df[['Score Change', 'Mistake Change']] = trends_df[['Score Change', 'Mistake Change']].astype(float)
+    domain_trends_df = pd.DataFrame([json.loads(row[8]) for row in rows]).fillna(0).astype(int)
+    domain_trends_df['Date'] = trends_df['Date']
+    return trends_df, domain_trends_df
+
+def _student_filter(column, students):
+    if students is None:
+        return "", []
+    students = list(students)
+    return f" WHERE {column} IN ({', '.join('?' * len(students))})", students
+
+def load_topic_history(students=None, db_path=HISTORY_DB):
+    # Long-format mistake history for the plan engine, flattened by SQLite's json_each rather than
+    # parsing every session in Python: (sessions_df, topics_df). sessions_df lists every session
+    # (Student, Date), including ones without mistakes; topics_df has one row per mistaken topic.
+    # Sessions stored before per-section topics fall back to their per-topic counts (section '').
+    where, params = _student_filter("s.student", students)
+    with closing(connect(db_path)) as conn:
+        sessions = conn.execute(f"SELECT s.student, s.date FROM sessions s{where}", params).fetchall()
+        topics = conn.execute(
+            "SELECT s.student, s.date, section.key, topic.key, json_extract(topic.value, '$.mistakes'), json_extract(topic.value, '$.weighted') "
+            f"FROM sessions s, json_each(s.results, '$.topics') section, json_each(section.value) topic{where} "
+            "UNION ALL "
+            "SELECT s.student, s.date, '', topic.key, topic.value, topic.value "
+            f"FROM sessions s, json_each(s.results, '$.mistakes') topic{where}{' AND' if where else ' WHERE'} json_type(s.results, '$.topics') IS NULL",
+            params + params
+        ).fetchall()
+    sessions_df = pd.DataFrame(sessions, columns=['Student', 'Date'])
+    topics_df = pd.DataFrame(topics, columns=['Student', 'Date', 'Section', 'Topic', 'Mistakes', 'Weighted_Mistakes'])
+    for frame in (sessions_df, topics_df):
+        frame['Date'] = pd.to_datetime(frame['Date'])
+    return sessions_df, topics_df
+
+def list_students(db_path=HISTORY_DB):
+    with closing(connect(db_path)) as conn:
+        return [student for (student,) in conn.execute("SELECT DISTINCT student FROM sessions ORDER BY student")]
+
+def migrate_json_history(json_path=HISTORY_JSON, db_path=HISTORY_DB):
+    # One-shot import of the legacy {student: {date: results}} file; existing rows win
+    with open(json_path, "r") as f:
+        try:
+            full_history = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Cannot migrate {json_path}: file is not valid JSON ({e})") from e
+    rows = [
+        (student, session_date(date), dumps_results(results))
+        for student, sessions in full_history.items()
+        for date, results in sessions.items()
+    ]
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for student, date, results in rows:
+            inserted = conn.execute(
+                "INSERT INTO sessions (student, date, results) VALUES (?, ?, ?) "
+                "ON CONFLICT (student, date) DO NOTHING",
+                (student, date, results)
+            ).rowcount
+            if inserted:
+                _index_session(conn, student, date, json.loads(results))
+    return len(rows)
+
+def ensure_history_store(db_path=HISTORY_DB, json_path=HISTORY_JSON):
+    # First run against an old deployment: carry history.json over into the store.
+    # A truncated legacy file (e.g. from a crash mid-json.dump) is left in place for manual
+    # recovery rather than blocking the app on every run.
+    if not os.path.exists(db_path) and os.path.exists(json_path):
+        try:
+            migrate_json_history(json_path, db_path)
+        except ValueError as e:
+            warnings.warn(str(e))
+            connect(db_path).close()
+
+@contextmanager
+def file_lock(path):
+    # Advisory lock on <path>.lock; cooperating writers of <path> serialize on it
+    with open(path + ".lock", "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def atomic_write_json(path, data):
+    # Write to a temp file in the same directory, fsync, then os.replace: readers see the old
+    # file or the new one, never a partially written one
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, default=_to_json, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def export_json_history(json_path=HISTORY_JSON, db_path=HISTORY_DB, students=None):
+    # Write the store out in the legacy {student: {date: results}} layout. Runs under the file lock
+    # and merges with what is already on disk, so concurrent exports (or entries only present in the
+    # file) are never dropped; for the same student/date the store's copy wins.
+    where, params = _student_filter("student", students)
+    query = "SELECT student, date, results FROM sessions" + where
+    with file_lock(json_path):
+        # Read the store under the lock too, so the last exporter to finish also has the newest rows
+        with closing(connect(db_path)) as conn:
+            rows = conn.execute(query, params).fetchall()
+        history = {}
+        if os.path.exists(json_path):
+            with open(json_path, "r") as f:
+                try:
+                    history = json.load(f)
+                except json.JSONDecodeError as e:
+                    warnings.warn(f"Replacing unreadable {json_path} ({e})")
+        for student, date, results in rows:
+            history.setdefault(student, {})[date] = json.loads(results)
+        atomic_write_json(json_path, history)
+    return len(rows)
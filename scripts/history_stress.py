@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+from scripts.data_analysis import analyze_mistakes
+from scripts.history_store import (
+    SCORE_BAND, _rollup_topics, connect, export_json_history, save_session, save_sessions, session_results, set_student_cohort
+)
+from scripts.synthetic_data import generate_answers
+
+# Hammers one history store from many processes at once and checks nothing was lost:
+#   - every writer saves its own sessions (one at a time and in bulk) -> all must be present
+#   - every writer also overwrites the same shared student/date -> exactly one row, and the
+#     rollups must not double count it
+#   - writers move students between cohorts and export history.json while others write
+SHARED = ('shared_student', '2025-06-01')
+
+def _sample_results(n, seed):
+    answers = generate_answers(n, 1, seed=seed)
+    return [session_results(analyze_mistakes(sheet.drop(columns=['Student_ID', 'Test_ID']).reset_index(drop=True), engine='compact'))
+            for _, sheet in answers.groupby('Student_ID', sort=True)]
+
+def _writer(worker, sessions_per_worker, samples, db_path, json_path):
+    sessions = []
+    for i in range(sessions_per_worker):
+        student = f"worker_{worker:03d}_student_{i % 5}"
+        session_date = f"2025-{i // 28 % 12 + 1:02d}-{i % 28 + 1:02d}"
+        sessions.append((student, session_date, samples[(worker + i) % len(samples)]))
+    half = len(sessions) // 2
+    for student, session_date, results in sessions[:half]:
+        save_session(student, session_date, results, db_path)
+        save_session(*SHARED, samples[worker % len(samples)], db_path)
+    save_sessions(sessions[half:], db_path)
+    set_student_cohort(f"worker_{worker:03d}_student_0", f"class_{worker % 3}", db_path)
+    set_student_cohort(SHARED[0], f"class_{worker % 3}", db_path)
+    export_json_history(json_path, db_path)
+    return [(student, session_date) for student, session_date, _ in sessions]
+
+def expected_rollups(conn):
+    # Rollup tables recomputed from scratch out of sessions + students
+    cohorts = dict(conn.execute("SELECT student, cohort FROM students").fetchall())
+    topics, domains, scores = Counter(), Counter(), Counter()
+    for student, session_date, results in conn.execute("SELECT student, date, results FROM sessions"):
+        results = json.loads(results)
+        key = (cohorts.get(student, ''), session_date[:7])
+        for section, topic, mistakes, weighted in _rollup_topics(results):
+            topics[key + (section, topic)] += mistakes
+        for domain, mistakes in results['mistakes_by_domain'].items():
+            domains[key + (domain,)] += mistakes
+        scores[key + (int(results['scores']['total_score']) // SCORE_BAND * SCORE_BAND,)] += 1
+    return topics, domains, scores
+
+def _stored(conn, query):
+    return Counter({row[:-1]: row[-1] for row in conn.execute(query) if row[-1]})
+
+def check_store(db_path, json_path, written):
+    problems = []
+    with closing(connect(db_path)) as conn:
+        stored = set(conn.execute("SELECT student, date FROM sessions").fetchall())
+        missing = set(written) - stored
+        if missing:
+            problems.append(f"{len(missing)} saved sessions missing from the store")
+        if conn.execute("SELECT COUNT(*) FROM trends").fetchone()[0] != len(stored):
+            problems.append("trends table out of step with sessions")
+        topics, domains, scores = expected_rollups(conn)
+        tables = {
+            'rollup_topics': (topics, "SELECT cohort, bucket, section, topic, mistakes FROM rollup_topics"),
+            'rollup_domains': (domains, "SELECT cohort, bucket, domain, mistakes FROM rollup_domains"),
+            'rollup_scores': (scores, "SELECT cohort, bucket, band, sessions FROM rollup_scores"),
+        }
+        for table, (expected, query) in tables.items():
+            if _stored(conn, query) != +expected:
+                problems.append(f"{table} disagrees with a rebuild from sessions")
+    with open(json_path, "r") as f:
+        exported = json.load(f)
+    exported_keys = {(student, session_date) for student, dates in exported.items() for session_date in dates}
+    if not exported_keys >= set(written) - missing:
+        problems.append("history.json export is missing sessions")
+    return problems
+
+def run_stress(workers=8, sessions_per_worker=40, workdir=None):
+    samples = _sample_results(8, seed=0)
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        db_path = os.path.join(tmp, "history.db")
+        json_path = os.path.join(tmp, "history.json")
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_writer, worker, sessions_per_worker, samples, db_path, json_path) for worker in range(workers)]
+            written = [key for future in futures for key in future.result()] + [SHARED]
+        seconds = time.perf_counter() - start
+        return {'sessions': len(written), 'seconds': seconds, 'problems': check_store(db_path, json_path, written)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress the history store with concurrent writers and check that no updates are lost.")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Concurrent writer processes")
+    parser.add_argument("-n", "--sessions", type=int, default=40, help="Sessions saved by each writer")
+    args = parser.parse_args(argv)
+
+    stats = run_stress(args.workers, args.sessions)
+    print(f"{args.workers} writers saved {stats['sessions']} sessions in {stats['seconds']:.2f}s")
+    for problem in stats['problems']:
+        print(f"FAIL: {problem}")
+    if not stats['problems']:
+        print("OK: no lost updates, rollups and export consistent")
+    return 1 if stats['problems'] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
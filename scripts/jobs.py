@@ -0,0 +1,207 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+from scripts.export_report import render_pdf, report_file_name
+from scripts.history_store import HISTORY_DB, HISTORY_JSON, export_json_history, migrate_json_history, rebuild_rollups
+
+# Background jobs for the Streamlit app. One queue per server process (shared by every session,
+# like the analysis cache) runs slow work off the script thread: a rerun only submits a job and
+# polls its status by id. Jobs are PDF rendering (reportlab) and SQLite maintenance, so a small
+# thread pool is enough and results come back without pickling.
+JOB_WORKERS = int(os.environ.get("SAT_JOB_WORKERS", 2))
+# Finished downloads live as temp files, bounded in total size and age
+MAX_ARTIFACT_BYTES = int(os.environ.get("SAT_ARTIFACT_CACHE_MB", 256)) * 2**20
+ARTIFACT_TTL = 3600
+# Job records kept for status polling; the oldest finished ones are forgotten first
+MAX_JOBS = 500
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+PENDING = (QUEUED, RUNNING)
+
+class ArtifactCache:
+    # Job outputs stored as files in a private temp directory. Least recently used files are deleted
+    # once the total passes max_bytes, expired ones (older than ttl seconds) on the next access, and
+    # the whole directory when the process exits.
+    def __init__(self, max_bytes=MAX_ARTIFACT_BYTES, ttl=ARTIFACT_TTL, directory=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = tempfile.mkdtemp(prefix="sat_artifacts_", dir=directory)
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (path, size, created)
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._evict()
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Artifact of {len(data)} bytes exceeds the {self.max_bytes} byte cache")
+        path = os.path.join(self.directory, uuid.uuid4().hex)
+        with open(path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (path, len(data), time.time())
+            self.total_bytes += len(data)
+            self._evict()
+
+    def get(self, key):
+        with self._lock:
+            self._evict()
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            path = self._entries[key][0]
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:  # evicted while we were reading
+            return None
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+            with suppress(FileNotFoundError):
+                os.remove(entry[0])
+
+    def _evict(self):
+        expired = time.time() - self.ttl
+        for key in [key for key, (_, _, created) in self._entries.items() if created < expired]:
+            self._remove(key)
+        while self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, artifacts=None, max_jobs=MAX_JOBS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sat-job")
+        self.artifacts = artifacts or ArtifactCache()
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._keys = {}  # dedupe key -> job id
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, key=None, label=None, file_name=None, mime=None):
+        # Returns a job id to poll. With file_name, fn returns bytes that are kept in the artifact
+        # cache for download. A job with the same key that is still pending, or whose artifact is
+        # still cached, is reused instead of running the work again (e.g. double clicks).
+        with self._lock:
+            existing = self._keys.get(key) if key is not None else None
+            if existing is not None and self._reusable(existing):
+                return existing
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id, 'kind': kind, 'label': label or kind, 'key': key, 'status': QUEUED,
+                'submitted': time.time(), 'started': None, 'finished': None,
+                'result': None, 'error': None, 'file_name': file_name, 'mime': mime
+            }
+            if key is not None:
+                self._keys[key] = job_id
+            self._prune()
+        self.executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _reusable(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or job['status'] == FAILED:
+            return False
+        return job['status'] in PENDING or (job['file_name'] is not None and job_id in self.artifacts)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _run(self, job_id, fn, args):
+        self._update(job_id, status=RUNNING, started=time.time())
+        try:
+            result = fn(*args)
+            if self._jobs[job_id]['file_name'] is not None:
+                self.artifacts.put(job_id, result)
+                result = None
+            self._update(job_id, status=DONE, result=result, finished=time.time())
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), finished=time.time())
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] not in PENDING]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            job = self._jobs.pop(job_id)
+            if self._keys.get(job['key']) == job_id:
+                del self._keys[job['key']]
+
+    def status(self, job_id):
+        # Copy of the job record, or None for unknown / forgotten ids
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def artifact(self, job_id):
+        # Bytes of a finished job's output, or None once it has been evicted
+        return self.artifacts.get(job_id)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        self.artifacts.close()
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+# Jobs the app submits
+
+def _rebuild_job(db_path):
+    return f"Rebuilt cohort rollups from {rebuild_rollups(db_path)} sessions"
+
+def _import_job(json_path, db_path):
+    if not os.path.exists(json_path):
+        raise ValueError(f"{json_path} not found")
+    return f"Imported {migrate_json_history(json_path, db_path)} sessions from {json_path} (existing sessions kept)"
+
+def _export_job(json_path, db_path):
+    return f"Exported {export_json_history(json_path, db_path)} sessions to {json_path}"
+
+def submit_report(student_name, analysis, plan, digest=None, queue=None):
+    # analysis is shared with the analysis cache; rendering only reads it
+    queue = queue or get_job_queue()
+    key = ('report', student_name, digest) if digest else None
+    return queue.submit('report', render_pdf, student_name, analysis, plan, key=key,
+                        label=f"PDF report for {student_name}", file_name=report_file_name(student_name), mime="application/pdf")
+
+def submit_rollup_rebuild(db_path=HISTORY_DB, queue=None):
+    queue = queue or get_job_queue()
+    return queue.submit('rebuild', _rebuild_job, db_path, key=('rebuild', db_path), label="Rebuild cohort rollups")
+
+def submit_history_import(json_path=HISTORY_JSON, db_path=HISTORY_DB, queue=None):
+    queue = queue or get_job_queue()
+    return queue.submit('migration', _import_job, json_path, db_path, label=f"Import {os.path.basename(json_path)}")
+
+def submit_history_export(json_path=HISTORY_JSON, db_path=HISTORY_DB, queue=None):
+    queue = queue or get_job_queue()
+    return queue.submit('migration', _export_job, json_path, db_path, label=f"Export {os.path.basename(json_path)}")
@@ -0,0 +1,76 @@
+import argparse
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from scripts.service import DEFAULT_PORT
+from scripts.synthetic_data import generate_answers
+
+ENDPOINTS = ('analyze', 'scores', 'plan', 'report')
+
+def make_sheets(n_sheets, tests_per_sheet=1, error_rate=0.3, seed=0):
+    # Upload-format CSV bodies (no Student_ID/Test_ID columns), one per simulated student
+    answers = generate_answers(n_sheets, tests_per_sheet, error_rate=error_rate, seed=seed)
+    return [sheet.drop(columns=['Student_ID', 'Test_ID']).to_csv(index=False).encode()
+            for _, sheet in answers.groupby('Student_ID', sort=True)]
+
+def post(url, body, timeout):
+    request = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "text/csv"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 'connection error'
+    return status, time.perf_counter() - start
+
+def run_load_test(base_url, endpoint='analyze', requests=200, concurrency=16, tests_per_sheet=1, seed=0, timeout=60, save=False):
+    sheets = make_sheets(min(requests, 100), tests_per_sheet, seed=seed)
+    url = f"{base_url.rstrip('/')}/{endpoint}"
+
+    def send(i):
+        query = f"?student=loadtest_{i:06d}" if save or endpoint == 'report' else ""
+        return post(url + query, sheets[i % len(sheets)], timeout)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(requests)))
+    seconds = time.perf_counter() - start
+
+    latencies = np.array([latency for status, latency in results if status == 200])
+    return {
+        'requests': requests,
+        'seconds': seconds,
+        'statuses': Counter(status for status, _ in results),
+        'throughput': len(latencies) / seconds,
+        'latency_ms': {f"p{p}": float(np.percentile(latencies, p) * 1000) for p in (50, 90, 99)} if len(latencies) else {}
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the analysis service with synthetic answer sheets.")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default='analyze')
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--tests", type=int, default=1, help="Practice tests per uploaded sheet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60, help="Client-side timeout per request in seconds")
+    parser.add_argument("--save", action="store_true", help="Record each analysis in the service's history store")
+    args = parser.parse_args(argv)
+
+    stats = run_load_test(args.url, args.endpoint, args.requests, args.concurrency, args.tests, args.seed, args.timeout, args.save)
+    print(f"{stats['requests']} requests in {stats['seconds']:.2f}s, {stats['throughput']:.1f} successful req/s")
+    print("Status codes: " + ", ".join(f"{status}: {count}" for status, count in sorted(stats['statuses'].items(), key=str)))
+    if stats['latency_ms']:
+        print("Latency (ms): " + ", ".join(f"{name} {value:.0f}" for name, value in stats['latency_ms'].items()))
+    return 0 if stats['statuses'].get(200) == stats['requests'] else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
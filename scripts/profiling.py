@@ -0,0 +1,86 @@
+import contextvars
+import json
+import sys
+import time
+from contextlib import ContextDecorator, contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Metrics are only recorded inside collect(); everywhere else stage() is a no-op. A context
+# variable keeps concurrent Streamlit sessions (one thread each) from mixing their metrics.
+_collector = contextvars.ContextVar('profiling_collector', default=None)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+class stage(ContextDecorator):
+    # Times a block or function: `with stage('parse', rows=len(df)):` or `@stage('study_plan')`.
+    # Set .rows inside the block when the row count is only known afterwards.
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self._metrics = None
+
+    def _recreate_cm(self):
+        # Fresh instance per decorated call so concurrent calls don't share timing state
+        return stage(self.name, self.rows)
+
+    def __enter__(self):
+        self._metrics = _collector.get()
+        if self._metrics is not None:
+            self._depth = self._metrics['_depth']
+            self._metrics['_depth'] += 1
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._metrics is not None:
+            self._metrics['_depth'] -= 1
+            self._metrics['stages'].append({
+                'stage': self.name,
+                'seconds': time.perf_counter() - self._start,
+                'rows': self.rows,
+                'peak_rss_mb': peak_rss_mb(),
+                'depth': self._depth,
+                'error': exc_type.__name__ if exc_type else None
+            })
+        return False
+
+def start_collection(**context):
+    # Begin recording stages in the current context. Extra keyword arguments (e.g. student,
+    # file digest) are stored alongside the stages for offline analysis.
+    metrics = {'stages': [], 'context': context, '_depth': 0}
+    metrics['_token'] = _collector.set(metrics)
+    metrics['_start'] = time.perf_counter()
+    return metrics
+
+def finish_collection(metrics, jsonl_path=None):
+    _collector.reset(metrics.pop('_token'))
+    del metrics['_depth']
+    metrics['total_seconds'] = time.perf_counter() - metrics.pop('_start')
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    if jsonl_path:
+        write_jsonl(jsonl_path, metrics)
+    return metrics
+
+@contextmanager
+def collect(jsonl_path=None, **context):
+    # Yields the metrics dict; stages are appended in completion order (inner before outer)
+    metrics = start_collection(**context)
+    try:
+        yield metrics
+    finally:
+        finish_collection(metrics, jsonl_path)
+
+def write_jsonl(path, metrics):
+    # One line per stage, each tagged with the run's context, so runs can be concatenated and loaded with pd.read_json(lines=True)
+    with open(path, "a") as f:
+        for record in metrics['stages']:
+            f.write(json.dumps({**metrics['context'], **record}, default=str) + "\n")
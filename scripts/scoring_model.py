@@ -0,0 +1,79 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# Raw-to-scaled conversion per practice-test form, loaded from data/scoring/<form>.json (or
+# $SAT_SCORING_DIR) and compiled into NumPy arrays so scoring any number of tests is indexing:
+#   sections.<Section>.module_questions  questions in Module 1 and Module 2
+#   sections.<Section>.routing_threshold Module 1 accuracy that routes to the harder Module 2
+#   sections.<Section>.scaled.lower/upper scaled score by raw correct (0..total) for each route
+#   percentiles.knots                    [total score, percentile] pairs, 'linear' or 'step'
+SCORING_DIR = os.environ.get("SAT_SCORING_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'scoring'))
+DEFAULT_FORM = 'default'
+ROUTES = ('lower', 'upper')
+INTERPOLATIONS = ('linear', 'step')
+
+class ScoringModel:
+    def __init__(self, spec):
+        self.form = spec['form']
+        self.sections = {}
+        for section, conf in spec['sections'].items():
+            questions = sum(conf['module_questions'].values())
+            table = np.array([conf['scaled'][route] for route in ROUTES], dtype=np.int64)
+            if table.shape[1] != questions + 1:
+                raise ValueError(f"Form {self.form}: {section} needs {questions + 1} scaled scores per route (0..{questions} correct), found {table.shape[1]}")
+            self.sections[section] = {
+                'm1_questions': conf['module_questions']['Module 1'],
+                'routing_threshold': conf['routing_threshold'],
+                'table': table
+            }
+
+        percentiles = spec['percentiles']
+        knots = np.array(sorted(percentiles['knots']), dtype=float)
+        self.interpolation = percentiles.get('interpolation', 'linear')
+        if self.interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Form {self.form}: unknown percentile interpolation {self.interpolation} (expected one of {', '.join(INTERPOLATIONS)})")
+        self.percentile_scores = knots[:, 0]
+        self.percentile_values = knots[:, 1]
+
+    def route(self, section, m1_correct, m1_answered):
+        # 1 = harder Module 2: Module 1 was attempted and met the routing threshold
+        conf = self.sections[section]
+        m1_correct = np.asarray(m1_correct)
+        return (np.asarray(m1_answered) & (m1_correct / conf['m1_questions'] >= conf['routing_threshold'])).astype(np.intp)
+
+    def scale(self, section, correct, m1_correct, m1_answered):
+        table = self.sections[section]['table']
+        raw = np.clip(np.asarray(correct, dtype=np.intp), 0, table.shape[1] - 1)
+        return table[self.route(section, m1_correct, m1_answered), raw]
+
+    def percentiles(self, total_scores):
+        total_scores = np.asarray(total_scores, dtype=float)
+        if self.interpolation == 'step':
+            # Highest knot at or below the score; below every knot gets the first knot's percentile
+            idx = np.searchsorted(self.percentile_scores, total_scores, side='right') - 1
+            values = self.percentile_values[np.maximum(idx, 0)]
+        else:
+            values = np.interp(total_scores, self.percentile_scores, self.percentile_values)
+        return np.floor(values).astype(int)
+
+def _form_path(form):
+    # A form name from the scoring directory, or a path to a form file
+    if form.endswith('.json'):
+        return form
+    return os.path.join(SCORING_DIR, f"{form}.json")
+
+@lru_cache(maxsize=None)
+def load_scoring_model(form=DEFAULT_FORM):
+    path = _form_path(form)
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown test form: {form} (available: {', '.join(list_forms())})")
+    with open(path, 'r') as f:
+        return ScoringModel(json.load(f))
+
+def list_forms():
+    if not os.path.isdir(SCORING_DIR):
+        return []
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(SCORING_DIR) if name.endswith('.json'))
@@ -0,0 +1,311 @@
+import argparse
+import io
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+import pandas as pd
+
+from scripts.columnar import is_parquet, read_parquet_answers
+from scripts.data_analysis import analyze_mistakes, score_cohort
+from scripts.export_report import render_pdf, report_file_name
+from scripts.history_store import HISTORY_DB, dumps_results, ensure_history_store, save_session, session_date, session_results
+from scripts.scoring_model import list_forms
+from scripts.study_plan import format_study_plan, generate_study_plan
+from scripts.validation import AnswerDataError, check_answers
+
+# HTTP front end for LMS integrations. Request threads only parse HTTP and write history; parsing
+# and analysis run on a bounded process pool. At most workers + queue_size requests are admitted
+# at once, anything beyond that is turned away with 503 + Retry-After instead of piling up.
+DEFAULT_PORT = 8502
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_TIMEOUT = 30
+MAX_BODY_BYTES = 64 * 2**20
+# Open connections (one thread each); beyond this new connections get an immediate 503
+DEFAULT_MAX_CONNECTIONS = 128
+# Seconds a connection may sit idle or trickle its body before it is dropped
+SOCKET_TIMEOUT = 30
+# A service task is one uploaded sheet, far smaller than a batch file (see MAX_BODY_BYTES), so a
+# worker can take many more before it is replaced; replacing it still bounds slow growth in a
+# process that runs for weeks
+TASKS_PER_WORKER = 200
+
+ANALYSIS_TABLES = ['mistakes_by_section', 'mistakes_by_topic', 'mistakes_by_domain', 'top_mistakes']
+
+# Worker-side jobs: take the raw upload, return plain picklable results
+
+def _read_answers(data):
+    df = read_parquet_answers(io.BytesIO(data)) if is_parquet(data) else pd.read_csv(io.BytesIO(data))
+    return check_answers(df)[0]
+
+def _analyze_job(data, form=None):
+    analysis = analyze_mistakes(_read_answers(data), engine='compact', form=form)
+    plan_dict = generate_study_plan(analysis['top_mistakes'])
+    return analysis, plan_dict
+
+def _scores_job(data, form=None):
+    df = _read_answers(data)
+    if {'Student_ID', 'Test_ID'} <= set(df.columns):
+        # Several students/tests in one sheet: one score row per (Student_ID, Test_ID)
+        return {'scores': score_cohort(df, form=form).to_dict(orient='records')}
+    return {'scores': analyze_mistakes(df, engine='compact', form=form)['scores']}
+
+def _plan_job(data, form=None):
+    _, plan_dict = _analyze_job(data, form)
+    return {'study_plan': plan_dict, 'text': format_study_plan(plan_dict)}
+
+def _report_job(data, student_name, form=None):
+    analysis, plan_dict = _analyze_job(data, form)
+    return render_pdf(student_name, analysis, format_study_plan(plan_dict))
+
+def analysis_payload(analysis, plan_dict):
+    payload = {table: analysis[table].to_dict(orient='records') for table in ANALYSIS_TABLES}
+    payload['scores'] = analysis['scores']
+    payload['study_plan'] = plan_dict
+    return payload
+
+def content_disposition(file_name):
+    # Plain-ASCII filename for old clients plus the exact (UTF-8) name as RFC 5987 filename*
+    ascii_name = re.sub(r'[^A-Za-z0-9._ -]', '_', file_name)
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(file_name, safe='')}"
+
+class ServiceBusy(Exception):
+    pass
+
+class Slot:
+    # One admitted request. Released exactly once: by the job it started, when that job finishes (a
+    # running job keeps its worker busy even after the client timed out), otherwise by the handler
+    def __init__(self, release):
+        self._release = release
+        self._lock = threading.Lock()
+        self.job_started = False
+        self.released = False
+
+    def release(self, _=None):
+        with self._lock:
+            if self.released:
+                return
+            self.released = True
+        self._release()
+
+class AnalysisService:
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, timeout=DEFAULT_TIMEOUT, db_path=HISTORY_DB):
+        workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=TASKS_PER_WORKER)
+        self.capacity = workers + queue_size
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.timeout = timeout
+        self.db_path = db_path
+        ensure_history_store(db_path)
+
+    def admit(self):
+        # Admission control, before the request body is read: fail fast when full rather than
+        # queueing (and buffering uploads) without bound
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy()
+        with self._lock:
+            self.in_flight += 1
+
+        def release():
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+        return Slot(release)
+
+    def run(self, slot, fn, *args):
+        # The admitted slot passes to the job and is held until it really finishes
+        slot.job_started = True
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            slot.release()
+            raise
+        future.add_done_callback(slot.release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()  # only succeeds while still queued
+            raise
+
+    def save(self, student, session_date, analysis):
+        save_session(student, session_date, session_results(analysis), self.db_path)
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "SATAnalyzer/1.0"
+    protocol_version = "HTTP/1.1"
+    timeout = SOCKET_TIMEOUT
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if content_type == "application/json":
+            body = dumps_results(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, headers=None):
+        self._send(status, {'error': message}, headers=headers)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            return self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        self._send(HTTPStatus.OK, {'status': 'ok', 'in_flight': self.service.in_flight, 'capacity': self.service.capacity})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        # Every endpoint takes ?form=<name>: the test form to score with (default: the sheet's Form column, else 'default')
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        routes = {'/analyze': self._analyze, '/scores': self._scores, '/plan': self._plan, '/report': self._report}
+        # Everything that can be checked without the body is checked before it is read; an early
+        # answer leaves the body unread, so the connection can't be reused
+        keep_alive = not self.close_connection
+        self.close_connection = True
+        if url.path not in routes:
+            return self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        # Only named forms from the scoring directory; load_scoring_model would also accept a file path
+        if 'form' in params and params['form'] not in list_forms():
+            return self._error(HTTPStatus.UNPROCESSABLE_ENTITY, f"Unknown test form (available: {', '.join(list_forms())})")
+        if 'date' in params:
+            try:
+                session_date(params['date'])
+            except ValueError as e:
+                return self._error(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length <= 0:
+            return self._error(HTTPStatus.BAD_REQUEST, "Request body must be an answer sheet (CSV or Parquet) with a valid Content-Length")
+        if length > MAX_BODY_BYTES:
+            return self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {MAX_BODY_BYTES} bytes")
+        try:
+            self.slot = self.service.admit()
+        except ServiceBusy:
+            return self._error(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, retry later", headers={"Retry-After": "1"})
+
+        try:
+            try:
+                data = self.rfile.read(length)
+            except OSError:  # stalled past SOCKET_TIMEOUT
+                return
+            if len(data) < length:  # client closed before sending the whole body; nobody to answer
+                return
+            self.close_connection = not keep_alive
+            routes[url.path](data, params)
+        except TimeoutError:
+            self._error(HTTPStatus.GATEWAY_TIMEOUT, f"Analysis did not finish within {self.service.timeout}s")
+        except AnswerDataError as e:
+            self._send(HTTPStatus.UNPROCESSABLE_ENTITY, {'error': "Answer sheet failed validation", 'report': e.report})
+        except (ValueError, KeyError, pd.errors.ParserError) as e:
+            self._error(HTTPStatus.UNPROCESSABLE_ENTITY, f"Cannot analyze answer sheet: {e}")
+        except Exception as e:
+            self._error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+        finally:
+            if not self.slot.job_started:
+                self.slot.release()
+
+    def _run(self, fn, *args):
+        return self.service.run(self.slot, fn, *args)
+
+    def _analyze(self, data, params):
+        # ?student=<name>[&date=YYYY-MM-DD] also records the session in the shared history store
+        analysis, plan_dict = self._run(_analyze_job, data, params.get('form'))
+        if params.get('student'):
+            self.service.save(params['student'], session_date(params.get('date') or date.today()), analysis)
+        self._send(HTTPStatus.OK, analysis_payload(analysis, plan_dict))
+
+    def _scores(self, data, params):
+        self._send(HTTPStatus.OK, self._run(_scores_job, data, params.get('form')))
+
+    def _plan(self, data, params):
+        self._send(HTTPStatus.OK, self._run(_plan_job, data, params.get('form')))
+
+    def _report(self, data, params):
+        student_name = params.get('student') or "Student"
+        pdf_bytes = self._run(_report_job, data, student_name, params.get('form'))
+        self._send(HTTPStatus.OK, pdf_bytes, "application/pdf",
+                   {"Content-Disposition": content_disposition(report_file_name(student_name))})
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+BUSY_RESPONSE = b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+
+class ServiceServer(ThreadingHTTPServer):
+    # ThreadingHTTPServer starts a thread per connection without limit; cap the open connections
+    # and turn away the rest before a thread is spent on them
+    daemon_threads = True
+
+    def __init__(self, address, handler, max_connections=DEFAULT_MAX_CONNECTIONS):
+        super().__init__(address, handler)
+        self._connections = threading.BoundedSemaphore(max_connections)
+
+    def process_request(self, request, client_address):
+        if not self._connections.acquire(blocking=False):
+            try:
+                request.sendall(BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._connections.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._connections.release()
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, quiet=False, max_connections=DEFAULT_MAX_CONNECTIONS, **options):
+    server = ServiceServer((host, port), ServiceHandler, max_connections)
+    server.service = AnalysisService(**options)
+    server.quiet = quiet
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve SAT analysis, scoring, study plans and PDF reports over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Requests allowed to wait for a worker before returning 503")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds before a request returns 504")
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS, help="Open connections before new ones get 503")
+    parser.add_argument("--db", default=HISTORY_DB, help="History store path")
+    parser.add_argument("--quiet", action="store_true", help="Don't log each request")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.quiet, args.max_connections, workers=args.workers, queue_size=args.queue_size,
+                         timeout=args.timeout, db_path=args.db)
+    print(f"Serving on http://{args.host}:{args.port} ({server.service.capacity} concurrent requests)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+if __name__ == "__main__":
+    main()
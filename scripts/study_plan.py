@@ -1,3 +1,13 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.history_store import HISTORY_DB, load_topic_history
+from scripts.profiling import stage
+
+@stage('study_plan')
 def generate_study_plan(top_mistakes):
     plan = {}
     for _, row in top_mistakes.iterrows():
@@ -10,4 +20,109 @@ def generate_study_plan(top_mistakes):
         else:
             time = "1 hour daily"
         plan[topic] = time
-    return plan
\ No newline at end of file
+    return plan
+
+def format_study_plan(plan):
+    return "Study Plan:\n\n" + "\n".join([f"{topic}: {time}" for topic, time in plan.items()])
+
+# History-based plans. Every (student, topic) is scored on the student's whole session series:
+#   decayed rate  = exponentially decayed Weighted_Mistakes per session (half-life HALF_LIFE_DAYS)
+#   trend         = short-half-life rate vs the decayed rate, > 0 when the topic is getting worse
+#   priority      = rate * (1 + TREND_WEIGHT * trend), trend clipped to [-1, 1]
+# The weekly budget is split across each student's top topics by priority, and reviews are spaced
+# by how many sessions in a row the topic has been mistake-free.
+HALF_LIFE_DAYS = 30
+SHORT_HALF_LIFE_DAYS = 7
+TREND_WEIGHT = 0.5
+WEEKLY_HOURS = 10
+TOP_TOPICS = 5
+MIN_HOURS = 0.5
+# Days until the next review, indexed by mistake-free sessions since the topic was last missed
+REVIEW_INTERVALS = np.array([1, 3, 7, 14, 30, 60])
+REVIEWS_SCHEDULED = 3
+PLAN_COLUMNS = ['Student', 'Section', 'Topic', 'Priority', 'Decayed_Rate', 'Trend', 'Hours_Per_Week', 'Next_Review', 'Review_Dates']
+
+def _decay(age_days, half_life):
+    return 0.5 ** (age_days / half_life)
+
+@stage('history_plan')
+def plan_from_history(sessions_df, topics_df, weekly_hours=WEEKLY_HOURS, top_k=TOP_TOPICS, as_of=None,
+                      half_life_days=HALF_LIFE_DAYS):
+    # sessions_df: (Student, Date) per session; topics_df: (Student, Date, Section, Topic, Weighted_Mistakes)
+    # per mistaken topic, as returned by history_store.load_topic_history. One vectorized pass for any
+    # number of students; as_of defaults to each student's latest session.
+    if topics_df.empty:
+        return pd.DataFrame(columns=PLAN_COLUMNS)
+    sessions_df = sessions_df.drop_duplicates(['Student', 'Date']).sort_values(['Student', 'Date'])
+    last_session = sessions_df.groupby('Student')['Date'].transform('max')
+    as_of_dates = pd.Series(pd.Timestamp(as_of), index=sessions_df.index) if as_of is not None else last_session
+    age = (as_of_dates - sessions_df['Date']).dt.days.clip(lower=0)
+    sessions_df = sessions_df.assign(
+        As_Of=as_of_dates,
+        Weight=_decay(age, half_life_days),
+        Short_Weight=_decay(age, SHORT_HALF_LIFE_DAYS),
+        Session_No=sessions_df.groupby('Student').cumcount()
+    )
+    per_student = sessions_df.groupby('Student').agg(
+        Weight=('Weight', 'sum'), Short_Weight=('Short_Weight', 'sum'),
+        Sessions=('Session_No', 'size'), As_Of=('As_Of', 'first')
+    )
+
+    rows = topics_df.merge(sessions_df[['Student', 'Date', 'Weight', 'Short_Weight', 'Session_No']], on=['Student', 'Date'])
+    rows['Weighted'] = rows['Weight'] * rows['Weighted_Mistakes']
+    rows['Short_Weighted'] = rows['Short_Weight'] * rows['Weighted_Mistakes']
+    plan = rows.groupby(['Student', 'Section', 'Topic']).agg(
+        Weighted=('Weighted', 'sum'), Short_Weighted=('Short_Weighted', 'sum'), Last_Missed=('Session_No', 'max')
+    ).reset_index().join(per_student, on='Student')
+
+    plan['Decayed_Rate'] = plan['Weighted'] / plan['Weight']
+    short_rate = plan['Short_Weighted'] / plan['Short_Weight']
+    plan['Trend'] = ((short_rate - plan['Decayed_Rate']) / plan['Decayed_Rate']).clip(-1, 1).fillna(0)
+    plan['Priority'] = plan['Decayed_Rate'] * (1 + TREND_WEIGHT * plan['Trend'])
+
+    plan = plan[plan['Priority'] > 0].sort_values(['Student', 'Priority', 'Section', 'Topic'], ascending=[True, False, True, True])
+    # Weekly budget in half-hour steps. Every planned topic gets one step (topics beyond the number
+    # of steps are dropped), the remaining steps are split by priority and the largest remainders
+    # get the leftovers, so a student's hours add up to the budget
+    total_steps = int(weekly_hours // MIN_HOURS)
+    plan = plan.groupby('Student').head(min(top_k, total_steps)).reset_index(drop=True)
+    spare = total_steps - plan.groupby('Student')['Priority'].transform('size')
+    steps = plan['Priority'] / plan.groupby('Student')['Priority'].transform('sum') * spare
+    base = np.floor(steps)
+    leftover = spare - base.groupby(plan['Student']).transform('sum')
+    extra = (steps - base).groupby(plan['Student']).rank(method='first', ascending=False) <= leftover
+    plan['Hours_Per_Week'] = (1 + base + extra) * MIN_HOURS
+
+    # Spaced reviews: start at the interval for the current mistake-free streak and widen from there
+    streak = (plan['Sessions'] - 1 - plan['Last_Missed']).to_numpy()
+    steps = np.minimum(streak[:, None] + np.arange(REVIEWS_SCHEDULED), len(REVIEW_INTERVALS) - 1)
+    offsets = np.cumsum(REVIEW_INTERVALS[steps], axis=1)
+    review_dates = (plan['As_Of'].to_numpy()[:, None] + offsets.astype('timedelta64[D]')).astype('datetime64[D]')
+    plan['Next_Review'] = review_dates[:, 0]
+    plan['Review_Dates'] = list(review_dates)
+    return plan[PLAN_COLUMNS]
+
+def cohort_study_plans(students=None, db_path=HISTORY_DB, **options):
+    # Plans for every student in the history store (or the given ones) in one call
+    sessions_df, topics_df = load_topic_history(students, db_path)
+    return plan_from_history(sessions_df, topics_df, **options)
+
+def history_study_plan(student, db_path=HISTORY_DB, **options):
+    return cohort_study_plans([student], db_path, **options)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate history-based weekly study plans for every student in the history store.")
+    parser.add_argument("-o", "--output", default="study_plans.csv", help="CSV to write (one row per student and topic)")
+    parser.add_argument("--db", default=HISTORY_DB, help="History store path")
+    parser.add_argument("--weekly-hours", type=float, default=WEEKLY_HOURS)
+    parser.add_argument("--top", type=int, default=TOP_TOPICS, help="Topics per student")
+    parser.add_argument("--as-of", default=None, help="Plan date (default: each student's latest session)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    plans = cohort_study_plans(db_path=args.db, weekly_hours=args.weekly_hours, top_k=args.top, as_of=args.as_of)
+    plans.assign(Review_Dates=[" ".join(str(day)[:10] for day in days) for days in plans['Review_Dates']]).to_csv(args.output, index=False)
+    print(f"Wrote plans for {plans['Student'].nunique()} students to {args.output} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
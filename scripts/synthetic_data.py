@@ -0,0 +1,100 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.data_analysis import CONTENT_DOMAINS, DIFFICULTY_LEVELS
+
+# Digital SAT layout: questions per module for each section
+MODULE_QUESTIONS = {'Reading and Writing': 27, 'Math': 22}
+MODULES = ['Module 1', 'Module 2']
+CHOICES = np.array(['A', 'B', 'C', 'D'])
+
+def _test_layout():
+    # (Section, Module) for every question of one practice test, in answer-sheet order
+    sections, modules = [], []
+    for section, questions in MODULE_QUESTIONS.items():
+        for module in MODULES:
+            sections += [section] * questions
+            modules += [module] * questions
+    return np.array(sections, dtype=object), np.array(modules, dtype=object)
+
+def generate_answers(n_students=1, n_tests=1, error_rate=0.3, difficulty_mix=(0.3, 0.4, 0.3), unknown_topic_rate=0.0, seed=0):
+    # One row per question per test per student; every test has both sections and both modules.
+    # Harder questions are missed more often, with error_rate as the overall mistake rate.
+    rng = np.random.default_rng(seed)
+    test_sections, test_modules = _test_layout()
+    per_test = len(test_sections)
+    n_sheets = n_students * n_tests
+    n = n_sheets * per_test
+
+    sections = np.tile(test_sections, n_sheets)
+    modules = np.tile(test_modules, n_sheets)
+
+    topics = np.empty(n, dtype=object)
+    for section, domains in CONTENT_DOMAINS.items():
+        section_topics = np.array([topic for domain_topics in domains.values() for topic in domain_topics], dtype=object)
+        mask = sections == section
+        topics[mask] = rng.choice(section_topics, mask.sum())
+    if unknown_topic_rate > 0:
+        topics[rng.random(n) < unknown_topic_rate] = 'Other'
+
+    difficulty_idx = rng.choice(len(DIFFICULTY_LEVELS), n, p=np.asarray(difficulty_mix) / np.sum(difficulty_mix))
+    weights = difficulty_idx + 1.0
+    miss_probability = np.clip(error_rate * weights / np.average(weights), 0, 1)
+    missed = rng.random(n) < miss_probability
+
+    correct_idx = rng.integers(0, len(CHOICES), n)
+    # A wrong answer is any of the other three choices
+    student_idx = np.where(missed, (correct_idx + rng.integers(1, len(CHOICES), n)) % len(CHOICES), correct_idx)
+
+    student_ids = np.repeat([f"student_{i:06d}" for i in range(n_students)], n_tests * per_test)
+    test_ids = np.tile(np.repeat(np.arange(1, n_tests + 1), per_test), n_students)
+
+    return pd.DataFrame({
+        'Student_ID': student_ids,
+        'Test_ID': test_ids,
+        'Question_ID': np.tile(np.arange(1, per_test + 1), n_sheets),
+        'Section': sections,
+        'Module': modules,
+        'Topic': topics,
+        'Student_Answer': CHOICES[student_idx],
+        'Correct_Answer': CHOICES[correct_idx],
+        'Difficulty': np.array(DIFFICULTY_LEVELS, dtype=object)[difficulty_idx]
+    })
+
+def write_student_csvs(output_dir, n_students, n_tests=1, seed=0, **options):
+    # One CSV per student in the upload format (the layout scripts.batch expects)
+    os.makedirs(output_dir, exist_ok=True)
+    answers = generate_answers(n_students, n_tests, seed=seed, **options)
+    paths = []
+    for student, sheet in answers.groupby('Student_ID', sort=True):
+        path = os.path.join(output_dir, f"{student}.csv")
+        sheet.drop(columns=['Student_ID', 'Test_ID']).to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic SAT answer sheets.")
+    parser.add_argument("output", help="CSV file to write, or a directory with --per-student")
+    parser.add_argument("--students", type=int, default=1)
+    parser.add_argument("--tests", type=int, default=1, help="Practice tests per student")
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--difficulty-mix", type=float, nargs=3, default=(0.3, 0.4, 0.3), metavar=('EASY', 'MEDIUM', 'HARD'))
+    parser.add_argument("--unknown-topic-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-student", action="store_true", help="Write one CSV per student into the output directory")
+    args = parser.parse_args(argv)
+
+    options = dict(error_rate=args.error_rate, difficulty_mix=args.difficulty_mix, unknown_topic_rate=args.unknown_topic_rate)
+    if args.per_student:
+        paths = write_student_csvs(args.output, args.students, args.tests, seed=args.seed, **options)
+        print(f"Wrote {len(paths)} files to {args.output}")
+    else:
+        answers = generate_answers(args.students, args.tests, seed=args.seed, **options)
+        answers.to_csv(args.output, index=False)
+        print(f"Wrote {len(answers)} rows to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from scripts.data_analysis import CONTENT_DOMAINS, DIFFICULTY_LEVELS, REQUIRED_COLUMNS, SCORED_MODULES, SCORED_SECTIONS
+from scripts.profiling import stage
+from scripts.scoring_model import list_forms
+
+# Upload validation and normalization, run before any analysis. Every check is one vectorized
+# pass over its column; the per-value work (normalizing spelling, looking up allowed values) is
+# done once per distinct value via factorize, so cost stays flat in the number of rows.
+MAX_REPORTED_ROWS = 100
+MAX_REPORTED_VALUES = 10
+# Columns that identify one answer sheet inside a multi-student / multi-test upload
+SHEET_KEYS = ['Student_ID', 'Test_ID']
+
+KNOWN_TOPICS = {
+    section: {topic.casefold(): topic for topics in domains.values() for topic in topics}
+    for section, domains in CONTENT_DOMAINS.items()
+}
+ALL_TOPICS = {key: topic for topics in KNOWN_TOPICS.values() for key, topic in topics.items()}
+ALLOWED_VALUES = {
+    'Section': {value.casefold(): value for value in SCORED_SECTIONS},
+    'Module': {value.casefold(): value for value in SCORED_MODULES},
+    'Difficulty': {value.casefold(): value for value in DIFFICULTY_LEVELS},
+}
+_INTEGRAL = re.compile(r'^([+-]?\d+)\.0*$')
+_SPACES = re.compile(r'\s+')
+
+class AnswerDataError(ValueError):
+    # Raised for uploads that fail validation; .report holds the structured report
+    def __init__(self, report):
+        super().__init__(format_report(report))
+        self.report = report
+
+    def __reduce__(self):
+        # Rebuilt from the report when it crosses a process boundary (batch/service workers)
+        return AnswerDataError, (self.report,)
+
+def _issue(check, column, message, rows, values=None):
+    rows = pd.Index(rows)
+    issue = {'check': check, 'column': column, 'message': message, 'count': len(rows), 'rows': rows[:MAX_REPORTED_ROWS].tolist()}
+    if values is not None:
+        issue['values'] = [str(value) for value in pd.unique(np.asarray(values, dtype=object))[:MAX_REPORTED_VALUES]]
+    return issue
+
+def _by_unique(series, fn):
+    # Apply fn to each distinct value once and broadcast the results back; NaN stays NaN
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = np.array([fn(value) for value in uniques] + [np.nan], dtype=object)
+    return pd.Series(mapped[codes], index=series.index, dtype=object)
+
+def normalize_answer(value):
+    # " b" -> "B", True / "true" -> "TRUE", 3.0 / "3.0" -> "3", "" -> NaN (unanswered)
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    text = str(value).strip().upper()
+    if not text:
+        return np.nan
+    return _INTEGRAL.sub(r'\1', text)
+
+def _label(value):
+    return _SPACES.sub(' ', str(value).strip())
+
+def _canonical(allowed):
+    # Matches allowed values regardless of case and spacing; anything else is kept (trimmed) and reported
+    def canonical(value):
+        label = _label(value)
+        return allowed.get(label.casefold(), label)
+    return canonical
+
+def new_report(rows=0):
+    return {'rows': rows, 'valid': True, 'errors': [], 'warnings': []}
+
+def merge_reports(total, report):
+    # Combine per-chunk reports; row indices are already global when chunks keep the file's index
+    for kind in ('errors', 'warnings'):
+        for issue in report[kind]:
+            same = next((existing for existing in total[kind] if existing['check'] == issue['check'] and existing['column'] == issue['column']), None)
+            if same is None:
+                total[kind].append(dict(issue))
+                continue
+            same['count'] += issue['count']
+            same['rows'] = (same['rows'] + issue['rows'])[:MAX_REPORTED_ROWS]
+            if 'values' in issue:
+                same['values'] = list(dict.fromkeys(same['values'] + issue['values']))[:MAX_REPORTED_VALUES]
+    total['rows'] += report['rows']
+    total['valid'] = not total['errors']
+    return total
+
+def sheet_key_columns(df):
+    return [col for col in SHEET_KEYS if col in df.columns] + ['Question_ID']
+
+def validate_answers(df, check_duplicates=True):
+    # Returns (normalized copy of df, report). Errors make the upload unusable; warnings (unknown
+    # topics) are analyzed as before, under the section's "Unknown (...)" domain.
+    report = new_report(len(df))
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        report['errors'].append(_issue('missing_column', ', '.join(missing), f"Missing required column(s): {', '.join(missing)}", []))
+        report['valid'] = False
+        return df, report
+
+    with stage('validate', rows=len(df)):
+        df = df.copy()
+        errors, warnings = report['errors'], report['warnings']
+
+        # Types: IDs must be whole numbers or labels; the label columns must not be numeric
+        question_ids = df['Question_ID']
+        if pd.api.types.is_float_dtype(question_ids):
+            fractional = question_ids.notna() & (question_ids % 1 != 0)
+            if fractional.any():
+                errors.append(_issue('dtype', 'Question_ID', "Question_ID must be a whole number or a label", df.index[fractional], question_ids[fractional]))
+        for col in ('Section', 'Module', 'Topic', 'Difficulty'):
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]) and df[col].notna().any():
+                errors.append(_issue('dtype', col, f"{col} must contain text labels, found {df[col].dtype} values", df.index[df[col].notna()], df[col].dropna()))
+
+        blank_ids = question_ids.isna()
+        if blank_ids.any():
+            errors.append(_issue('missing_value', 'Question_ID', "Question_ID is empty", df.index[blank_ids]))
+
+        # Allowed values, matched regardless of case and surrounding spaces
+        for col, allowed in ALLOWED_VALUES.items():
+            df[col] = _by_unique(df[col], _canonical(allowed))
+            bad = ~df[col].isin(list(allowed.values()))
+            if bad.any():
+                errors.append(_issue(
+                    'allowed_values', col, f"{col} must be one of: {', '.join(allowed.values())}",
+                    df.index[bad], df[col][bad].fillna('(empty)')
+                ))
+
+        # Topics: canonical spelling within the row's section; unknown ones are only a warning
+        # (topic names are unique across sections, so one lookup serves both)
+        df['Topic'] = _by_unique(df['Topic'], _canonical(ALL_TOPICS))
+        known = pd.Series(False, index=df.index)
+        for section, topics in KNOWN_TOPICS.items():
+            known |= (df['Section'] == section) & df['Topic'].isin(list(topics.values()))
+        unknown = ~known & df['Section'].isin(SCORED_SECTIONS)
+        if unknown.any():
+            warnings.append(_issue('unknown_topic', 'Topic', "Topic not in the section's taxonomy; counted under an Unknown domain", df.index[unknown], df['Topic'][unknown].fillna('(empty)')))
+
+        # Answers: trimmed, upper-cased, booleans and whole numbers spelled one way
+        for col in ('Student_Answer', 'Correct_Answer'):
+            df[col] = _by_unique(df[col], normalize_answer)
+        no_key = df['Correct_Answer'].isna()
+        if no_key.any():
+            errors.append(_issue('missing_value', 'Correct_Answer', "Correct_Answer is empty, the question can't be graded", df.index[no_key]))
+
+        # Optional Form column: each test is scored with that form's conversion tables
+        if 'Form' in df.columns:
+            df['Form'] = _by_unique(df['Form'], _label)
+            forms = list_forms()
+            bad = df['Form'].notna() & ~df['Form'].isin(forms)
+            if bad.any():
+                errors.append(_issue('allowed_values', 'Form', f"Form must be one of the scoring forms: {', '.join(forms)}", df.index[bad], df['Form'][bad]))
+
+        if check_duplicates:
+            keys = sheet_key_columns(df)
+            duplicated = df.duplicated(keys, keep=False) & ~blank_ids
+            if duplicated.any():
+                errors.append(_issue('duplicate', 'Question_ID', f"Question_ID appears more than once per sheet ({', '.join(keys)})", df.index[duplicated], question_ids[duplicated]))
+
+    report['valid'] = not errors
+    return df, report
+
+def check_answers(df):
+    # validate_answers that raises AnswerDataError instead of returning an invalid report
+    df, report = validate_answers(df)
+    if not report['valid']:
+        raise AnswerDataError(report)
+    return df, report
+
+class StreamValidator:
+    # Validates and normalizes a file chunk by chunk (pass it as analyze_mistakes_chunked's prepare=).
+    # Row errors raise as soon as a chunk has them; duplicates across chunks are checked in finish()
+    # from hashes of the sheet keys, so memory is 8 bytes per row rather than the keys themselves.
+    def __init__(self):
+        self.report = new_report()
+        self._hashes = []
+        self._rows = []
+
+    def __call__(self, chunk):
+        chunk, report = validate_answers(chunk, check_duplicates=False)
+        merge_reports(self.report, report)
+        if not self.report['valid']:
+            raise AnswerDataError(self.report)
+        keys = chunk[sheet_key_columns(chunk)]
+        self._hashes.append(pd.util.hash_pandas_object(keys, index=False).to_numpy())
+        self._rows.append(chunk.index.to_numpy())
+        return chunk
+
+    def finish(self):
+        if self._hashes:
+            hashes = np.concatenate(self._hashes)
+            rows = np.concatenate(self._rows)
+            _, inverse, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+            duplicated = counts[inverse] > 1
+            if duplicated.any():
+                merge_reports(self.report, {'rows': 0, 'valid': False, 'warnings': [], 'errors': [
+                    _issue('duplicate', 'Question_ID', "Question_ID appears more than once per sheet", rows[duplicated])
+                ]})
+        if not self.report['valid']:
+            raise AnswerDataError(self.report)
+        return self.report
+
+def format_report(report):
+    lines = [f"{len(report['errors'])} problem(s) found in {report['rows']} rows:" if report['errors'] else f"{report['rows']} rows validated"]
+    for kind, issues in (('Error', report['errors']), ('Warning', report['warnings'])):
+        for issue in issues:
+            line = f"{kind}: {issue['message']} ({issue['count']} rows"
+            if issue['rows']:
+                line += f", e.g. rows {', '.join(str(row) for row in issue['rows'][:5])}"
+            if issue.get('values'):
+                line += f"; values: {', '.join(issue['values'][:5])}"
+            lines.append(line + ")")
+    return "\n".join(lines)
+
+def report_frame(report):
+    # One row per issue, for display
+    return pd.DataFrame([
+        {'Severity': kind, 'Column': issue['column'], 'Problem': issue['message'], 'Rows': issue['count'],
+         'Example Rows': ", ".join(str(row) for row in issue['rows'][:10]), 'Example Values': ", ".join(issue.get('values', []))}
+        for kind, issues in (('Error', report['errors']), ('Warning', report['warnings']))
+        for issue in issues
+    ], columns=['Severity', 'Column', 'Problem', 'Rows', 'Example Rows', 'Example Values'])